@@ -71,20 +71,54 @@ def temp_cwd(tmp_path, monkeypatch):
     return cwd
 
 
+# ============================================================================
+# Module Cache Reset
+# ============================================================================
+
+@pytest.fixture(autouse=True)
+def reset_module_caches(monkeypatch):
+    """Drop per-process caches (keyring lookup, shared console, permission warnings) so each test sees its own mocks."""
+    from terminal_chat import cli
+
+    cli._keyring_get.cache_clear()
+    monkeypatch.setattr(cli, "_console", None)
+    monkeypatch.setattr(cli, "_warned_permissions", set())
+    yield
+    cli._keyring_get.cache_clear()
+
+
 # ============================================================================
 # Keyring Mocks
 # ============================================================================
 
+def _keyring_get_none(service, username):
+    return None
+
+
+def _keyring_set_noop(service, username, password):
+    return None
+
+
 @pytest.fixture
 def mock_keyring(monkeypatch):
-    """Mock keyring module with successful operations."""
-    mock_get = Mock(return_value=None)
-    mock_set = Mock()
+    """Stub keyring with an empty store. Plain functions, since no test asserts on these calls."""
+    monkeypatch.setattr("terminal_chat.cli.keyring.get_password", _keyring_get_none)
+    monkeypatch.setattr("terminal_chat.cli.keyring.set_password", _keyring_set_noop)
 
-    monkeypatch.setattr("terminal_chat.cli.keyring.get_password", mock_get)
-    monkeypatch.setattr("terminal_chat.cli.keyring.set_password", mock_set)
+    return {"get_password": _keyring_get_none, "set_password": _keyring_set_noop}
 
-    return {"get_password": mock_get, "set_password": mock_set}
+
+@pytest.fixture(scope="module")
+def mock_keyring_module():
+    """Module-scoped empty keyring stub, for module-scoped fixtures that build a Config once."""
+    from terminal_chat import cli
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("terminal_chat.cli.keyring.get_password", _keyring_get_none)
+        mp.setattr("terminal_chat.cli.keyring.set_password", _keyring_set_noop)
+        cli._keyring_get.cache_clear()
+        yield
+    cli._keyring_get.cache_clear()
 
 
 @pytest.fixture
@@ -126,10 +160,44 @@ def mock_env_token(monkeypatch):
 
 @pytest.fixture
 def clean_env(monkeypatch):
-    """Remove all ASK_* environment variables."""
+    """Remove ASK_API_TOKEN, the only environment variable Config reads. Touches just that key, not a copy of os.environ."""
     monkeypatch.delenv("ASK_API_TOKEN", raising=False)
 
 
+@pytest.fixture(scope="module")
+def clean_env_module():
+    """Module-scoped clean_env, for module-scoped fixtures that build a Config once."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.delenv("ASK_API_TOKEN", raising=False)
+        yield
+
+
+@pytest.fixture(scope="module")
+def baseline_config(tmp_path_factory, mock_keyring_module, clean_env_module):
+    """A minimal Config (LLM and API_TOKEN only), built once per test module for read-only default checks."""
+    from terminal_chat import cli
+
+    home = tmp_path_factory.mktemp("baseline_home")
+    create_config_file(home / ".askrc", LLM="anthropic/claude-haiku-4.5", API_TOKEN="sk-test")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(Path, "home", lambda: home)
+        mp.chdir(home)
+        return cli.Config()
+
+
+@pytest.fixture
+def make_chat(mock_keyring_module, clean_env_module):
+    """Factory for a TerminalChat over an in-memory Config; pass only the settings a test varies."""
+    from terminal_chat.cli import TerminalChat
+
+    def _make_chat(**settings):
+        settings.setdefault("LLM", "anthropic/claude-haiku-4.5")
+        settings.setdefault("API_TOKEN", "sk-test")
+        return TerminalChat(config_from_values(**settings))
+
+    return _make_chat
+
+
 # ============================================================================
 # API Mocks
 # ============================================================================
@@ -153,9 +221,7 @@ def mock_streaming_response(api_responses):
     """Create a mock response for streaming chat."""
     mock_response = Mock()
     mock_response.status_code = 200
-    mock_response.iter_lines = Mock(
-        return_value=[line.encode() for line in api_responses["chat_success_stream"]]
-    )
+    mock_response.iter_lines = mock_iter_lines(line.encode() for line in api_responses["chat_success_stream"])
     return mock_response
 
 
@@ -253,13 +319,22 @@ def mock_prompt_session(monkeypatch):
     return mock_session
 
 
-@pytest.fixture
-def mock_confirm(monkeypatch):
-    """Mock rich.prompt.Confirm."""
+@pytest.fixture(scope="module")
+def _patched_confirm():
+    """Patch rich.prompt.Confirm once for the whole requesting module."""
     mock = Mock()
     mock.ask = Mock(return_value=True)
-    monkeypatch.setattr("terminal_chat.cli.Confirm", mock)
-    return mock
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("terminal_chat.cli.Confirm", mock)
+        yield mock
+
+
+@pytest.fixture
+def mock_confirm(_patched_confirm):
+    """Mock rich.prompt.Confirm, with calls and side effect reset and ask answering True."""
+    _patched_confirm.ask.reset_mock(side_effect=True)
+    _patched_confirm.ask.return_value = True
+    return _patched_confirm
 
 
 @pytest.fixture
@@ -307,32 +382,39 @@ def mock_signal(monkeypatch):
 def create_config_file(path: Path, **kwargs):
     """Helper to create a config file with specified options."""
     path.parent.mkdir(parents=True, exist_ok=True)
-
-    with open(path, "w") as f:
-        for key, value in kwargs.items():
-            f.write(f"{key}={value}\n")
+    path.write_text("".join(f"{key}={value}\n" for key, value in kwargs.items()))
 
     return path
 
 
+def config_from_values(**kwargs):
+    """Helper to build a Config from settings directly, without writing a config file."""
+    from terminal_chat.cli import Config
+
+    return Config({key: str(value) for key, value in kwargs.items()})
+
+
 def create_mock_stream_response(chunks: list):
     """Helper to create a mock streaming response from a list of chunks."""
     mock_response = Mock()
     mock_response.status_code = 200
 
-    formatted_chunks = []
-    for chunk in chunks:
-        if isinstance(chunk, dict):
-            formatted_chunks.append(f"data: {json.dumps(chunk)}\n\n".encode())
-        else:
-            formatted_chunks.append(chunk.encode())
-
-    mock_response.iter_lines = Mock(return_value=formatted_chunks)
+    mock_response.iter_lines = mock_iter_lines(
+        f"data: {json.dumps(chunk)}\n\n".encode() if isinstance(chunk, dict) else chunk.encode()
+        for chunk in chunks
+    )
     return mock_response
 
 
+def mock_iter_lines(lines):
+    """Helper to create an iter_lines mock that hands out a fresh iterator over the same lines on every call."""
+    lines = tuple(lines)
+    return Mock(side_effect=lambda *args, **kwargs: iter(lines))
+
+
 # Expose helper functions for import
 __all__ = [
     "create_config_file",
     "create_mock_stream_response",
+    "mock_iter_lines",
 ]
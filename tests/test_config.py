@@ -4,10 +4,9 @@ Tests for Config class.
 import os
 import stat
 from pathlib import Path
-from unittest.mock import Mock, patch, call
 import pytest
-from terminal_chat.cli import Config
-from tests.conftest import create_config_file
+from terminal_chat.cli import Config, SetupWizard, _as_bool, _as_int
+from tests.conftest import create_config_file, config_from_values
 
 
 class TestConfigBasics:
@@ -74,6 +73,33 @@ class TestConfigBasics:
             Config()
 
 
+    def test_unchanged_config_parsed_once(self, temp_home, mock_keyring, clean_env):
+        """Test that repeated Config() constructions reuse the parsed file."""
+        from terminal_chat import cli
+
+        config_path = temp_home / ".askrc"
+        create_config_file(config_path, LLM="anthropic/claude-haiku-4.5", API_TOKEN="sk-test")
+
+        Config()
+        hits = cli._parse_askrc.cache_info().hits
+        config = Config()
+
+        assert cli._parse_askrc.cache_info().hits == hits + 1
+        assert config.llm == "anthropic/claude-haiku-4.5"
+
+    def test_changed_config_reparsed(self, temp_home, mock_keyring, clean_env):
+        """Test that editing the file invalidates the cached parse."""
+        config_path = temp_home / ".askrc"
+        create_config_file(config_path, LLM="anthropic/claude-haiku-4.5", API_TOKEN="sk-test")
+        Config()
+
+        create_config_file(config_path, LLM="openai/gpt-5-mini", API_TOKEN="sk-test", SHOW_COST="true")
+        config = Config()
+
+        assert config.llm == "openai/gpt-5-mini"
+        assert config.show_cost is True
+
+
 class TestTokenLoading:
     """Test API token loading from various sources."""
 
@@ -108,14 +134,33 @@ class TestTokenLoading:
         assert config.api_token == "sk-file-token"
         assert config.token_source == "file"
 
-    def test_token_priority_keyring_over_env(self, temp_home, mock_keyring_with_token, mock_env_token):
-        """Test that keyring takes priority over environment."""
+    def test_token_priority_env_over_keyring(self, temp_home, mock_keyring_with_token, mock_env_token):
+        """Test that environment takes priority over keyring, which is not queried."""
         config_path = temp_home / ".askrc"
         create_config_file(config_path, LLM="anthropic/claude-haiku-4.5")
 
         config = Config()
-        assert config.api_token == mock_keyring_with_token["token"]
-        assert config.token_source == "keychain"
+        assert config.api_token == mock_env_token
+        assert config.token_source == "environment"
+        mock_keyring_with_token["get_password"].assert_not_called()
+
+    def test_keyring_queried_once_per_process(self, temp_home, mock_keyring_with_token, clean_env):
+        """Test that repeated Config() calls reuse the cached keyring lookup."""
+        config_path = temp_home / ".askrc"
+        create_config_file(config_path, LLM="anthropic/claude-haiku-4.5")
+
+        for _ in range(3):
+            assert Config().api_token == mock_keyring_with_token["token"]
+        mock_keyring_with_token["get_password"].assert_called_once()
+
+    def test_keyring_failure_cached(self, temp_home, mock_keyring_failure, clean_env):
+        """Test that an unavailable keyring is not probed again."""
+        config_path = temp_home / ".askrc"
+        create_config_file(config_path, LLM="anthropic/claude-haiku-4.5", API_TOKEN="sk-file-token")
+
+        Config()
+        Config()
+        assert mock_keyring_failure["get_password"].call_count == 1
 
     def test_token_priority_env_over_file(self, temp_home, mock_keyring, mock_env_token):
         """Test that environment takes priority over file."""
@@ -139,6 +184,19 @@ class TestTokenLoading:
         assert config.api_token == mock_env_token
         assert config.token_source == "environment"
 
+    def test_saved_token_replaces_cached_lookup(self, temp_home, mock_keyring_with_token, mock_console, clean_env):
+        """Test that a token stored by the setup wizard is picked up despite the cached lookup."""
+        config_path = temp_home / ".askrc"
+        create_config_file(config_path, LLM="anthropic/claude-haiku-4.5")
+        assert Config().api_token == mock_keyring_with_token["token"]
+
+        new_token = "sk-test-new-keyring-token-67890"
+        mock_keyring_with_token["get_password"].return_value = new_token
+        assert SetupWizard(mock_console)._save_to_keychain(new_token, "anthropic/claude-haiku-4.5", {})
+
+        mock_keyring_with_token["set_password"].assert_called_once()
+        assert Config().api_token == new_token
+
     def test_missing_token_all_sources(self, temp_home, mock_keyring, clean_env):
         """Test error when token is missing from all sources."""
         config_path = temp_home / ".askrc"
@@ -151,155 +209,55 @@ class TestTokenLoading:
 class TestConfigDefaults:
     """Test default configuration values."""
 
-    def test_render_markdown_default(self, temp_home, mock_keyring, clean_env):
-        """Test that RENDER_MARKDOWN defaults to true."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test"
-        )
-
-        config = Config()
-        assert config.render_markdown is True
-
-    def test_show_panels_default(self, temp_home, mock_keyring, clean_env):
-        """Test that SHOW_PANELS defaults to true."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test"
-        )
-
-        config = Config()
-        assert config.show_panels is True
-
-    def test_show_cost_default(self, temp_home, mock_keyring, clean_env):
-        """Test that SHOW_COST defaults to false."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test"
-        )
-
-        config = Config()
-        assert config.show_cost is False
-
-    def test_input_prefix_default(self, temp_home, mock_keyring, clean_env):
-        """Test that INPUT_PREFIX defaults to '> '."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test"
-        )
-
-        config = Config()
-        assert config.input_prefix == "> "
-
-    def test_max_tokens_default(self, temp_home, mock_keyring, clean_env):
-        """Test that MAX_TOKENS defaults to 4096."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test"
-        )
-
-        config = Config()
-        assert config.max_tokens == 4096
-
-    def test_max_input_length_default(self, temp_home, mock_keyring, clean_env):
-        """Test that MAX_INPUT_LENGTH defaults to 10000."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test"
-        )
-
-        config = Config()
-        assert config.max_input_length == 10000
-
-    def test_guardrail_default(self, temp_home, mock_keyring, clean_env):
-        """Test that GUARDRAIL defaults to 'system'."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test"
-        )
-
-        config = Config()
-        assert config.guardrail == "system"
-
-    def test_guardrail_check_default(self, temp_home, mock_keyring, clean_env):
-        """Test that EXTERNAL_GUARDRAIL_CHECK_DIRECTIONS defaults to 'both'."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test"
-        )
-
-        config = Config()
-        assert config.guardrail_check == "both"
-
-    def test_show_intent_default(self, temp_home, mock_keyring, clean_env):
-        """Test that SHOW_INTENT defaults to true."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test"
-        )
-
-        config = Config()
-        assert config.show_intent is True
+    @pytest.mark.parametrize("attr,expected", [
+        ("render_markdown", True),
+        ("show_panels", True),
+        ("show_cost", False),
+        ("input_prefix", "> "),
+        ("max_tokens", 4096),
+        ("max_input_length", 10000),
+        ("guardrail", "system"),
+        ("guardrail_model", "meta-llama/llama-guard-4-12b"),
+        ("guardrail_check", "both"),
+        ("show_intent", True),
+    ])
+    def test_defaults(self, baseline_config, attr, expected):
+        """Test each setting's default, checked against one shared minimal Config."""
+        assert getattr(baseline_config, attr) == expected
+        assert type(getattr(baseline_config, attr)) is type(expected)
 
 
 class TestInputPrefixHandling:
     """Test INPUT_PREFIX handling and auto-spacing."""
 
-    def test_input_prefix_with_space(self, temp_home, mock_keyring, clean_env):
+    def test_input_prefix_with_space(self, mock_keyring, clean_env):
         """Test that prefix with space is not modified."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
+        config = config_from_values(
             LLM="anthropic/claude-haiku-4.5",
             API_TOKEN="sk-test",
             INPUT_PREFIX="ask: "
         )
 
-        config = Config()
         assert config.input_prefix == "ask: "
 
-    def test_input_prefix_without_space(self, temp_home, mock_keyring, clean_env):
+    def test_input_prefix_without_space(self, mock_keyring, clean_env):
         """Test that prefix without space gets space added."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
+        config = config_from_values(
             LLM="anthropic/claude-haiku-4.5",
             API_TOKEN="sk-test",
             INPUT_PREFIX="ask:"
         )
 
-        config = Config()
         assert config.input_prefix == "ask: "
 
-    def test_input_prefix_empty_string(self, temp_home, mock_keyring, clean_env):
+    def test_input_prefix_empty_string(self, mock_keyring, clean_env):
         """Test handling of empty INPUT_PREFIX."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
+        config = config_from_values(
             LLM="anthropic/claude-haiku-4.5",
             API_TOKEN="sk-test",
             INPUT_PREFIX=""
         )
 
-        config = Config()
         assert config.input_prefix == " "  # Space added to empty
 
     @pytest.mark.parametrize("prefix,expected", [
@@ -311,17 +269,14 @@ class TestInputPrefixHandling:
         (">>> ", ">>> "),  # Already has space
         ("test  ", "test  "),  # Multiple spaces preserved
     ])
-    def test_input_prefix_variations(self, temp_home, mock_keyring, clean_env, prefix, expected):
+    def test_input_prefix_variations(self, mock_keyring, clean_env, prefix, expected):
         """Test various INPUT_PREFIX values."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
+        config = config_from_values(
             LLM="anthropic/claude-haiku-4.5",
             API_TOKEN="sk-test",
             INPUT_PREFIX=prefix
         )
 
-        config = Config()
         assert config.input_prefix == expected
 
 
@@ -329,17 +284,14 @@ class TestGuardrailValidation:
     """Test guardrail configuration validation."""
 
     @pytest.mark.parametrize("guardrail_value", ["system", "external", "intent", "none"])
-    def test_valid_guardrail_values(self, temp_home, mock_keyring, clean_env, guardrail_value):
+    def test_valid_guardrail_values(self, mock_keyring, clean_env, guardrail_value):
         """Test all valid GUARDRAIL values."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
+        config = config_from_values(
             LLM="anthropic/claude-haiku-4.5",
             API_TOKEN="sk-test",
             GUARDRAIL=guardrail_value
         )
 
-        config = Config()
         assert config.guardrail == guardrail_value
 
     def test_invalid_guardrail_value(self, temp_home, mock_keyring, clean_env):
@@ -356,31 +308,25 @@ class TestGuardrailValidation:
             Config()
 
     @pytest.mark.parametrize("check_value", ["input", "output", "both"])
-    def test_valid_guardrail_check_values(self, temp_home, mock_keyring, clean_env, check_value):
+    def test_valid_guardrail_check_values(self, mock_keyring, clean_env, check_value):
         """Test all valid EXTERNAL_GUARDRAIL_CHECK_DIRECTIONS values."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
+        config = config_from_values(
             LLM="anthropic/claude-haiku-4.5",
             API_TOKEN="sk-test",
             EXTERNAL_GUARDRAIL_CHECK_DIRECTIONS=check_value
         )
 
-        config = Config()
         assert config.guardrail_check == check_value
 
-    def test_invalid_guardrail_check_value(self, temp_home, mock_keyring, clean_env):
+    def test_invalid_guardrail_check_value(self, mock_keyring, clean_env):
         """Test that invalid EXTERNAL_GUARDRAIL_CHECK_DIRECTIONS defaults to 'both'."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
+        # Invalid values default to 'both'
+        config = config_from_values(
             LLM="anthropic/claude-haiku-4.5",
             API_TOKEN="sk-test",
             EXTERNAL_GUARDRAIL_CHECK_DIRECTIONS="invalid"
         )
 
-        # Invalid values default to 'both'
-        config = Config()
         assert config.guardrail_check == "both"
 
 
@@ -394,88 +340,64 @@ class TestBooleanParsing:
         ("false", False),
         ("False", False),
         ("FALSE", False),
+        ("1", True),
+        ("yes", True),
+        ("on", True),
+        ("0", False),
+        ("Yes", True),
+        ("ON", True),
+        ("Off", False),
     ])
-    def test_boolean_values(self, temp_home, mock_keyring, clean_env, value, expected):
+    def test_boolean_values(self, value, expected):
         """Test boolean parsing for RENDER_MARKDOWN."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test",
-            RENDER_MARKDOWN=value
-        )
+        assert _as_bool({"RENDER_MARKDOWN": value}, "RENDER_MARKDOWN", True) is expected
 
-        config = Config()
-        assert config.render_markdown is expected
+    def test_missing_boolean_uses_default(self):
+        """Test that a missing boolean falls back to its default."""
+        assert _as_bool({}, "RENDER_MARKDOWN", True) is True
+        assert _as_bool({"RENDER_MARKDOWN": None}, "RENDER_MARKDOWN", False) is False
 
-    def test_invalid_boolean_defaults_to_false(self, temp_home, mock_keyring, clean_env):
+    def test_invalid_boolean_defaults_to_false(self, mock_keyring, clean_env):
         """Test that invalid boolean defaults to false."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
+        config = config_from_values(
             LLM="anthropic/claude-haiku-4.5",
             API_TOKEN="sk-test",
             RENDER_MARKDOWN="invalid"
         )
 
-        config = Config()
         assert config.render_markdown is False
 
 
 class TestIntegerParsing:
     """Test integer configuration parsing."""
 
-    def test_valid_max_tokens(self, temp_home, mock_keyring, clean_env):
+    def test_valid_max_tokens(self, mock_keyring, clean_env):
         """Test parsing valid MAX_TOKENS."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
+        config = config_from_values(
             LLM="anthropic/claude-haiku-4.5",
             API_TOKEN="sk-test",
             MAX_TOKENS="8192"
         )
 
-        config = Config()
         assert config.max_tokens == 8192
 
-    def test_invalid_max_tokens_uses_default(self, temp_home, mock_keyring, clean_env):
+    def test_invalid_max_tokens_uses_default(self):
         """Test that invalid MAX_TOKENS uses default."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test",
-            MAX_TOKENS="invalid"
-        )
-
-        config = Config()
-        assert config.max_tokens == 4096  # Default
+        assert _as_int({"MAX_TOKENS": "invalid"}, "MAX_TOKENS", 4096) == 4096
 
-    def test_valid_max_input_length(self, temp_home, mock_keyring, clean_env):
+    def test_valid_max_input_length(self, mock_keyring, clean_env):
         """Test parsing valid MAX_INPUT_LENGTH."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
+        config = config_from_values(
             LLM="anthropic/claude-haiku-4.5",
             API_TOKEN="sk-test",
             MAX_INPUT_LENGTH="50000"
         )
 
-        config = Config()
         assert config.max_input_length == 50000
 
-    def test_invalid_max_input_length_uses_default(self, temp_home, mock_keyring, clean_env):
+    def test_invalid_max_input_length_uses_default(self):
         """Test that invalid MAX_INPUT_LENGTH uses default."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test",
-            MAX_INPUT_LENGTH="not_a_number"
-        )
-
-        config = Config()
-        assert config.max_input_length == 10000  # Default
+        assert _as_int({"MAX_INPUT_LENGTH": "not_a_number"}, "MAX_INPUT_LENGTH", 10000) == 10000
 
 
 class TestLocalConfigOverride:
@@ -567,9 +489,7 @@ class TestLocalConfigOverride:
 class TestSecurityFeatures:
     """Test security-related features."""
 
-    @patch('os.chmod')
-    @patch('os.stat')
-    def test_insecure_permissions_warning(self, mock_stat, mock_chmod, temp_home, mock_keyring, clean_env, mock_console):
+    def test_insecure_permissions_warning(self, temp_home, mock_keyring, clean_env, capsys):
         """Test warning for insecure file permissions."""
         config_path = temp_home / ".askrc"
         create_config_file(
@@ -577,16 +497,11 @@ class TestSecurityFeatures:
             LLM="anthropic/claude-haiku-4.5",
             API_TOKEN="sk-token"
         )
-
-        # Mock insecure permissions (readable by others)
-        mock_stat_result = Mock()
-        mock_stat_result.st_mode = 0o644  # rw-r--r--
-        mock_stat.return_value = mock_stat_result
+        config_path.chmod(0o644)  # rw-r--r--
 
         Config()
 
-        # Should have printed warning (checked via mock_console if used)
-        # Actual implementation may use Console.print
+        assert "insecure permissions 0o644" in capsys.readouterr().err
 
     def test_rich_markup_escaping_in_prefix(self, temp_home, mock_keyring, clean_env):
         """Test that Rich markup in INPUT_PREFIX is escaped."""
@@ -606,7 +521,7 @@ class TestSecurityFeatures:
 class TestMigrationSuggestion:
     """Test token migration suggestion."""
 
-    def test_suggest_migration_when_token_in_file(self, temp_home, mock_keyring, clean_env, capsys):
+    def test_suggest_migration_when_token_in_file(self, temp_home, mock_keyring, clean_env):
         """Test migration suggestion when token is in file."""
         config_path = temp_home / ".askrc"
         create_config_file(
@@ -617,8 +532,8 @@ class TestMigrationSuggestion:
 
         config = Config()
 
-        # Should suggest migration (check captured output or console calls)
         assert config.token_source == "file"
+        assert config.migration_suggested is True
 
     def test_no_migration_suggestion_when_in_keyring(self, temp_home, mock_keyring_with_token, clean_env):
         """Test no migration suggestion when token is in keyring."""
@@ -627,7 +542,7 @@ class TestMigrationSuggestion:
 
         config = Config()
         assert config.token_source == "keychain"
-        # No migration suggestion should appear
+        assert config.migration_suggested is False
 
 
 class TestEdgeCases:
@@ -649,7 +564,7 @@ class TestEdgeCases:
             f.write("LLM\n")  # Missing value
             f.write("API_TOKEN=sk-token\n")
 
-        # Should handle gracefully (dotenv_values is forgiving)
+        # Should handle gracefully (the parser skips lines it cannot use)
         config = Config()
         # LLM should be missing, causing SystemExit
         # But this actually raises SystemExit due to missing LLM
@@ -675,9 +590,36 @@ class TestEdgeCases:
             f.write("  API_TOKEN  =  sk-token  \n")
 
         config = Config()
-        # dotenv_values should handle trimming
+        # The parser should handle trimming
         assert "anthropic/claude-haiku-4.5" in config.llm
 
+    def test_config_quoting_and_inline_comments(self, temp_home, mock_keyring, clean_env):
+        """Test quoted values, inline comments and export prefixes."""
+        config_path = temp_home / ".askrc"
+        with open(config_path, "w") as f:
+            f.write("export LLM=anthropic/claude-haiku-4.5  # default model\n")
+            f.write("API_TOKEN='sk-token'\n")
+            f.write('SYSTEM_PROMPT="Be brief # no fluff" # trailing\n')
+            f.write("EXTERNAL_GUARDRAIL_MODEL=a=b\n")
+
+        config = Config()
+        assert config.llm == "anthropic/claude-haiku-4.5"
+        assert config.api_token == "sk-token"
+        assert config.system_prompt == "Be brief # no fluff"
+        assert config.guardrail_model == "a=b"
+
+    def test_config_escaped_quotes(self, temp_home, mock_keyring, clean_env):
+        """Test that escaped quotes and backslashes inside quoted values are decoded, as dotenv does."""
+        config_path = temp_home / ".askrc"
+        with open(config_path, "w") as f:
+            f.write('LLM="anthropic/claude-haiku-4.5"\n')
+            f.write("API_TOKEN='sk-it\\'s-a-token'\n")
+            f.write('SYSTEM_PROMPT="Say \\"hi\\" via C:\\\\tools\\tthen stop" # trailing\n')
+
+        config = Config()
+        assert config.api_token == "sk-it's-a-token"
+        assert config.system_prompt == 'Say "hi" via C:\\tools\tthen stop'
+
     def test_unicode_in_system_prompt(self, temp_home, mock_keyring, clean_env):
         """Test handling unicode characters in SYSTEM_PROMPT."""
         config_path = temp_home / ".askrc"
@@ -2,7 +2,7 @@
 Tests for ConversationManager class.
 """
 import pytest
-from terminal_chat.cli import ConversationManager
+from terminal_chat.cli import ConversationManager, _ROLE_SYSTEM, _ROLE_USER
 
 
 class TestConversationManager:
@@ -151,6 +151,19 @@ class TestConversationManager:
 
         assert manager.get_messages() == []
 
+    def test_remove_last_message(self):
+        """Test removing the most recent message, and that it's a no-op when empty."""
+        manager = ConversationManager()
+        manager.add_message("system", "System")
+        manager.add_message("user", "Hello")
+
+        manager.remove_last_message()
+        assert [m["role"] for m in manager.get_messages()] == ["system"]
+
+        manager.clear()
+        manager.remove_last_message()
+        assert manager.get_messages() == []
+
     def test_get_messages_returns_copy(self):
         """Test that get_messages returns a new list (not reference)."""
         manager = ConversationManager()
@@ -321,3 +334,96 @@ class TestConversationManager:
         assert len(messages) == 3
         assert messages[0]["role"] == "system"
         assert messages[1]["content"] == "Message 3"
+
+    def test_messages_list_reused_until_changed(self):
+        """Test that get_messages is rebuilt only after the history changes."""
+        manager = ConversationManager(max_messages=3)
+        manager.add_message("system", "System")
+        messages = manager.get_messages()
+        assert manager.get_messages() is messages
+
+        for i in range(5):
+            manager.add_message("user", f"Message {i}")
+
+        messages = manager.get_messages()
+        assert [m["content"] for m in messages] == ["System", "Message 3", "Message 4"]
+        assert manager.get_messages() is messages
+
+    def test_message_dicts_built_once(self):
+        """Test that each message dict is created on add and shared by later get_messages calls."""
+        manager = ConversationManager(max_messages=5)
+        manager.add_message("user", "Hello")
+        first = manager.get_messages()[0]
+
+        manager.add_message("assistant", "Hi")
+        assert manager.get_messages()[0] is first
+
+    def test_evicted_messages_left_intact(self):
+        """Test that eviction never mutates a message a caller still holds."""
+        manager = ConversationManager(max_messages=2)
+        manager.add_message("user", "Old")
+        held = manager.get_messages()[0]
+
+        manager.add_message("assistant", "Reply")
+        manager.add_message("user", "New")
+
+        assert held == {"role": "user", "content": "Old"}
+        assert held not in manager.get_messages()
+
+    def test_runtime_built_roles_interned(self):
+        """Test that roles built at runtime share one string object and still pin the system message."""
+        manager = ConversationManager(max_messages=2)
+        manager.add_message("".join(["sys", "tem"]), "System")
+        manager.add_message("".join(["us", "er"]), "Hello")
+        manager.add_message("user", "Again")
+
+        messages = manager.get_messages()
+        assert messages[0]["role"] is _ROLE_SYSTEM
+        assert messages[1]["role"] is _ROLE_USER
+
+    @pytest.mark.parametrize("max_messages", [1, 3, 20])
+    def test_extend_matches_add(self, max_messages):
+        """Test that extend_messages leaves the same history as adding one at a time."""
+        batch = [("system", "System")] + [("user" if i % 2 == 0 else "assistant", f"Message {i}") for i in range(30)]
+        one_by_one = ConversationManager(max_messages=max_messages)
+        for role, content in batch:
+            one_by_one.add_message(role, content)
+
+        extended = ConversationManager(max_messages=max_messages)
+        extended.extend_messages(batch)
+
+        assert extended.get_messages() == one_by_one.get_messages()
+
+    def test_extend_empty(self):
+        """Test that extending with nothing leaves the history empty."""
+        manager = ConversationManager()
+        manager.extend_messages([])
+        assert manager.get_messages() == []
+
+    def test_late_system_message_pinned_once_first(self):
+        """Test that a system message is pinned once the window drops the messages ahead of it."""
+        manager = ConversationManager(max_messages=3)
+        manager.add_message("user", "Message 0")
+        manager.add_message("system", "Late system")
+        for i in range(1, 5):
+            manager.add_message("user", f"Message {i}")
+
+        assert [m["content"] for m in manager.get_messages()] == ["Late system", "Message 3", "Message 4"]
+
+    def test_extend_pins_late_system_message(self):
+        """Test that extend_messages pins a system message that reaches the front mid-batch."""
+        batch = [("user", "Message 0"), ("system", "Late system")] + [("user", f"Message {i}") for i in range(1, 5)]
+        manager = ConversationManager(max_messages=3)
+        manager.extend_messages(batch)
+
+        assert [m["content"] for m in manager.get_messages()] == ["Late system", "Message 3", "Message 4"]
+
+    def test_system_message_with_max_one(self):
+        """Test that a window of one keeps only the system message."""
+        manager = ConversationManager(max_messages=1)
+        manager.add_message("system", "System")
+        manager.add_message("user", "Hello")
+
+        messages = manager.get_messages()
+        assert len(messages) == 1
+        assert messages[0]["role"] == "system"
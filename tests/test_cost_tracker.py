@@ -52,6 +52,16 @@ class TestCostTracker:
         assert cost["output_cost"] == 10.0
         assert cost["total_cost"] == 11.0
 
+    def test_get_cost_fractional_millions_exact(self):
+        """Test that costs for fractional millions of tokens come out as round figures."""
+        tracker = CostTracker("anthropic/claude-haiku-4.5")
+        tracker.add_usage(1_500_000, 1_500_000)
+
+        cost = tracker.get_cost()
+        assert cost["input_cost"] == 1.5
+        assert cost["output_cost"] == 7.5
+        assert cost["total_cost"] == 9.0
+
     def test_get_cost_gpt_5_mini(self):
         """Test cost calculation for GPT-5 Mini."""
         tracker = CostTracker("openai/gpt-5-mini")
@@ -120,6 +130,18 @@ class TestCostTracker:
         assert "Cost:" in formatted
         assert "$" in formatted
 
+    def test_format_cost_reused_until_usage_changes(self):
+        """Test that format_cost returns the same string until new usage is added."""
+        tracker = CostTracker("anthropic/claude-haiku-4.5")
+        tracker.add_usage(1000, 5000)
+
+        first = tracker.format_cost()
+        assert tracker.format_cost() is first
+        assert "1,000 in / 5,000 out" in first
+
+        tracker.add_usage(1000, 0)
+        assert "2,000 in / 5,000 out" in tracker.format_cost()
+
     def test_format_cost_without_pricing(self):
         """Test formatting cost display when pricing is not available."""
         tracker = CostTracker("anthropic/claude-haiku-4.5")
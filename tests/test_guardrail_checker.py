@@ -1,102 +1,110 @@
 """
 Tests for GuardrailChecker class.
 """
+import functools
 import json
 from unittest.mock import Mock, patch, MagicMock
 import pytest
-from terminal_chat.cli import GuardrailChecker, Config
-from tests.conftest import create_config_file
+import requests
+from terminal_chat.cli import GuardrailChecker, _VerdictCache
+from tests.conftest import config_from_values
+
+# Long enough to cross any buffer-size branch; the chat loop rejects input past max_input_length first anyway.
+_LONG_INPUT = "A" * 4096
+
+
+class _FakeResponse:
+    """The slice of requests.Response the guardrail reads: status_code and the raw body."""
+
+    __slots__ = ("status_code", "content")
+
+    def __init__(self, content, status_code=200):
+        self.status_code = status_code
+        self.content = content
+
+
+@functools.lru_cache(maxsize=None)
+def _llama_guard_response(verdict):
+    """A 200 response carrying the given Llama Guard verdict, shared by every test that uses it."""
+    return _FakeResponse(json.dumps({"choices": [{"message": {"content": verdict}}]}).encode())
+
+
+@pytest.fixture(scope="module")
+def _patched_session_post():
+    """Patch requests.Session.post once for the whole module."""
+    with patch.object(requests.Session, 'post') as mock:
+        yield mock
 
 
 @pytest.fixture
-def mock_config_system(temp_home, mock_keyring, clean_env):
-    """Create a config with system guardrail."""
-    config_path = temp_home / ".askrc"
-    create_config_file(
-        config_path,
-        LLM="anthropic/claude-haiku-4.5",
-        API_TOKEN="sk-test",
-        GUARDRAIL="system"
-    )
-    return Config()
+def mock_post(_patched_session_post):
+    """The module-wide Session.post mock, with return value, side effect and calls reset for this test."""
+    _patched_session_post.reset_mock(return_value=True, side_effect=True)
+    return _patched_session_post
 
 
 @pytest.fixture
-def mock_config_external(temp_home, mock_keyring, clean_env):
+def mock_config_external(mock_keyring, clean_env):
     """Create a config with external guardrail."""
-    config_path = temp_home / ".askrc"
-    create_config_file(
-        config_path,
+    return config_from_values(
         LLM="anthropic/claude-haiku-4.5",
         API_TOKEN="sk-test",
         GUARDRAIL="external",
         EXTERNAL_GUARDRAIL_CHECK_DIRECTIONS="both"
     )
-    return Config()
 
 
-@pytest.fixture
-def mock_config_intent(temp_home, mock_keyring, clean_env):
-    """Create a config with intent guardrail."""
-    config_path = temp_home / ".askrc"
-    create_config_file(
-        config_path,
-        LLM="anthropic/claude-haiku-4.5",
-        API_TOKEN="sk-test",
-        GUARDRAIL="intent",
-        SHOW_INTENT="true"
-    )
-    return Config()
+def _read_only_checker(guardrail):
+    """Build a GuardrailChecker for a mode whose checks don't mutate it."""
+    config = config_from_values(LLM="anthropic/claude-haiku-4.5", API_TOKEN="sk-test", GUARDRAIL=guardrail)
+    return GuardrailChecker(config, config.api_token, Mock())
 
 
-@pytest.fixture
-def mock_config_none(temp_home, mock_keyring, clean_env):
-    """Create a config with no guardrail."""
-    config_path = temp_home / ".askrc"
-    create_config_file(
-        config_path,
-        LLM="anthropic/claude-haiku-4.5",
-        API_TOKEN="sk-test",
-        GUARDRAIL="none"
-    )
-    return Config()
+@pytest.fixture(scope="module")
+def system_checker(mock_keyring_module, clean_env_module):
+    """A system-mode checker shared by the tests in this module."""
+    return _read_only_checker("system")
+
+
+@pytest.fixture(scope="module")
+def none_checker(mock_keyring_module, clean_env_module):
+    """A disabled-guardrail checker shared by the tests in this module."""
+    return _read_only_checker("none")
+
+
+@pytest.fixture(scope="module")
+def intent_checker(mock_keyring_module, clean_env_module):
+    """An intent-mode checker shared by the tests in this module; parse_intent_response is stateless."""
+    return _read_only_checker("intent")
 
 
 class TestGuardrailCheckerInit:
     """Test GuardrailChecker initialization."""
 
-    def test_init_system(self, mock_config_system, mock_console):
-        """Test initialization with system guardrail."""
-        checker = GuardrailChecker(mock_config_system, mock_config_system.api_token, mock_console)
+    @pytest.mark.parametrize("mode", ["system", "external", "intent", "none"])
+    def test_init(self, mode, mock_keyring, clean_env, mock_console):
+        """Test initialization for each guardrail mode."""
+        config = config_from_values(LLM="anthropic/claude-haiku-4.5", API_TOKEN="sk-test", GUARDRAIL=mode)
 
-        assert checker.config.guardrail == "system"
+        checker = GuardrailChecker(config, config.api_token, mock_console)
+
+        assert checker.config.guardrail == mode
+        assert checker.api_token == "sk-test"
 
-    def test_init_external(self, mock_config_external, mock_console):
-        """Test initialization with external guardrail."""
+    def test_init_external_checks_both_directions(self, mock_config_external, mock_console):
+        """Test that the external guardrail keeps its configured check directions."""
         checker = GuardrailChecker(mock_config_external, mock_config_external.api_token, mock_console)
 
         assert checker.config.guardrail == "external"
         assert checker.config.guardrail_check == "both"
 
-    def test_init_intent(self, mock_config_intent, mock_console):
-        """Test initialization with intent guardrail."""
-        checker = GuardrailChecker(mock_config_intent, mock_config_intent.api_token, mock_console)
-
-        assert checker.config.guardrail == "intent"
-
-    def test_init_none(self, mock_config_none, mock_console):
-        """Test initialization with no guardrail."""
-        checker = GuardrailChecker(mock_config_none, mock_config_none.api_token, mock_console)
-
-        assert checker.config.guardrail == "none"
-
 
 class TestSystemGuardrail:
     """Test system guardrail mode."""
 
-    def test_check_input_always_passes(self, mock_config_system, mock_console):
+    def test_check_input_always_passes(self, system_checker):
         """Test that system guardrail always passes input checks."""
-        checker = GuardrailChecker(mock_config_system, mock_config_system.api_token, mock_console)
+        checker = system_checker
 
         allowed, reason = checker.check_input("Safe message")
         assert allowed is True
@@ -106,9 +114,9 @@ class TestSystemGuardrail:
         assert allowed is True
         assert reason == ""
 
-    def test_check_output_always_passes(self, mock_config_system, mock_console):
+    def test_check_output_always_passes(self, system_checker):
         """Test that system guardrail always passes output checks."""
-        checker = GuardrailChecker(mock_config_system, mock_config_system.api_token, mock_console)
+        checker = system_checker
 
         allowed, reason = checker.check_output("Safe response")
         assert allowed is True
@@ -118,35 +126,30 @@ class TestSystemGuardrail:
 class TestNoneGuardrail:
     """Test disabled guardrail mode."""
 
-    def test_check_input_bypassed(self, mock_config_none, mock_console):
+    def test_check_input_bypassed(self, none_checker):
         """Test that no guardrail bypasses all input checks."""
-        checker = GuardrailChecker(mock_config_none, mock_config_none.api_token, mock_console)
+        checker = none_checker
 
         allowed, reason = checker.check_input("Any message")
         assert allowed is True
         assert reason == ""
 
-    def test_check_output_bypassed(self, mock_config_none, mock_console):
+    def test_check_output_bypassed(self, none_checker):
         """Test that no guardrail bypasses all output checks."""
-        checker = GuardrailChecker(mock_config_none, mock_config_none.api_token, mock_console)
+        checker = none_checker
 
         allowed, reason = checker.check_output("Any response")
         assert allowed is True
         assert reason == ""
 
 
+@pytest.mark.api
 class TestExternalGuardrail:
     """Test external guardrail (Llama Guard) mode."""
 
-    @patch('terminal_chat.cli.requests.post')
     def test_check_input_safe(self, mock_post, mock_config_external, mock_console):
         """Test external guardrail with safe input."""
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "choices": [{"message": {"content": "safe"}}]
-        }
-        mock_post.return_value = mock_response
+        mock_post.return_value = _llama_guard_response("safe")
 
         checker = GuardrailChecker(mock_config_external, mock_config_external.api_token, mock_console)
         allowed, reason = checker.check_input("Hello, how are you?")
@@ -154,15 +157,9 @@ class TestExternalGuardrail:
         assert allowed is True
         assert reason == ""
 
-    @patch('terminal_chat.cli.requests.post')
     def test_check_input_unsafe(self, mock_post, mock_config_external, mock_console):
         """Test external guardrail with unsafe input."""
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "choices": [{"message": {"content": "unsafe\nS3: Violent Crimes"}}]
-        }
-        mock_post.return_value = mock_response
+        mock_post.return_value = _llama_guard_response("unsafe\nS3: Violent Crimes")
 
         checker = GuardrailChecker(mock_config_external, mock_config_external.api_token, mock_console)
         allowed, reason = checker.check_input("Harmful content")
@@ -171,15 +168,9 @@ class TestExternalGuardrail:
         # Reason should be formatted as "Sex-Related Crimes (S3)"
         assert "S3" in reason and "Crimes" in reason
 
-    @patch('terminal_chat.cli.requests.post')
     def test_check_output_safe(self, mock_post, mock_config_external, mock_console):
         """Test external guardrail with safe output."""
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "choices": [{"message": {"content": "safe"}}]
-        }
-        mock_post.return_value = mock_response
+        mock_post.return_value = _llama_guard_response("safe")
 
         checker = GuardrailChecker(mock_config_external, mock_config_external.api_token, mock_console)
         allowed, reason = checker.check_output("Here is helpful information.")
@@ -187,71 +178,50 @@ class TestExternalGuardrail:
         assert allowed is True
         assert reason == ""
 
-    @patch('terminal_chat.cli.requests.post')
-    def test_check_only_input(self, mock_post, temp_home, mock_keyring, clean_env, mock_console):
-        """Test checking only input when configured."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
+    @pytest.mark.parametrize("direction,check_method,skip_method", [
+        ("input", "check_input", "check_output"),
+        ("output", "check_output", "check_input"),
+    ], ids=["input", "output"])
+    def test_check_only_direction(self, mock_post, mock_keyring, clean_env, mock_console,
+                                  direction, check_method, skip_method):
+        """Test checking only the configured direction."""
+        config = config_from_values(
             LLM="anthropic/claude-haiku-4.5",
             API_TOKEN="sk-test",
             GUARDRAIL="external",
-            EXTERNAL_GUARDRAIL_CHECK_DIRECTIONS="input"
+            EXTERNAL_GUARDRAIL_CHECK_DIRECTIONS=direction
         )
-        config = Config()
 
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "choices": [{"message": {"content": "safe"}}]
-        }
-        mock_post.return_value = mock_response
+        mock_post.return_value = _llama_guard_response("safe")
 
         checker = GuardrailChecker(config, config.api_token, mock_console)
 
-        # Input should be checked
-        allowed, reason = checker.check_input("Test")
-        assert mock_post.called
-
-        mock_post.reset_mock()
-
-        # Output should NOT be checked
-        allowed, reason = checker.check_output("Test")
+        # The other direction should NOT be checked
+        allowed, reason = getattr(checker, skip_method)("Test")
         assert allowed is True
         assert not mock_post.called
 
-    @patch('terminal_chat.cli.requests.post')
-    def test_check_only_output(self, mock_post, temp_home, mock_keyring, clean_env, mock_console):
-        """Test checking only output when configured."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test",
-            GUARDRAIL="external",
-            EXTERNAL_GUARDRAIL_CHECK_DIRECTIONS="output"
-        )
-        config = Config()
+        # The configured direction should be checked
+        allowed, reason = getattr(checker, check_method)("Test")
+        assert mock_post.called
 
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "choices": [{"message": {"content": "safe"}}]
-        }
-        mock_post.return_value = mock_response
+    def test_session_reused_across_checks(self, mock_post, mock_config_external, mock_console):
+        """Test that input and output checks share one authenticated session until close()."""
+        mock_post.return_value = _llama_guard_response("safe")
 
-        checker = GuardrailChecker(config, config.api_token, mock_console)
+        checker = GuardrailChecker(mock_config_external, mock_config_external.api_token, mock_console)
+        checker.check_input("Test")
+        session = checker.session
+        checker.check_output("Test")
 
-        # Input should NOT be checked
-        allowed, reason = checker.check_input("Test")
-        assert allowed is True
-        assert not mock_post.called
+        assert session is not None
+        assert checker.session is session
+        assert session.headers["Authorization"] == f"Bearer {mock_config_external.api_token}"
+        assert mock_post.call_count == 2
 
-        # Output should be checked
-        allowed, reason = checker.check_output("Test")
-        assert mock_post.called
+        checker.close()
+        assert checker.session is None
 
-    @patch('terminal_chat.cli.requests.post')
     def test_external_api_failure(self, mock_post, mock_config_external, mock_console, mock_confirm):
         """Test handling of external API failure."""
         mock_post.side_effect = Exception("API Error")
@@ -264,7 +234,6 @@ class TestExternalGuardrail:
         assert mock_confirm.ask.called
         assert allowed is True
 
-    @patch('terminal_chat.cli.requests.post')
     def test_external_api_failure_user_stops(self, mock_post, mock_config_external, mock_console, mock_confirm):
         """Test handling when user chooses to stop after API failure."""
         mock_post.side_effect = Exception("API Error")
@@ -276,49 +245,111 @@ class TestExternalGuardrail:
         assert allowed is False
         assert "failed" in reason.lower() or "error" in reason.lower()
 
-    @patch('terminal_chat.cli.requests.post')
+    def test_external_api_failure_deferred(self, mock_post, mock_config_external, mock_console, mock_confirm):
+        """Test that ask_on_failure=False reports the failure instead of prompting."""
+        mock_post.side_effect = Exception("API Error")
+
+        checker = GuardrailChecker(mock_config_external, mock_config_external.api_token, mock_console)
+        allowed, reason = checker.check_input("Test", ask_on_failure=False)
+
+        assert allowed is None
+        assert reason == "API Error"
+        assert not mock_confirm.ask.called
+
     def test_llama_guard_prompt_format(self, mock_post, mock_config_external, mock_console):
         """Test that Llama Guard prompt is formatted correctly."""
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "choices": [{"message": {"content": "safe"}}]
-        }
-        mock_post.return_value = mock_response
+        mock_post.return_value = _llama_guard_response("safe")
 
         checker = GuardrailChecker(mock_config_external, mock_config_external.api_token, mock_console)
         checker.check_input("Test message")
 
         # Verify the API call
         call_args = mock_post.call_args
-        messages = call_args[1]["json"]["messages"]
+        messages = json.loads(call_args[1]["data"])["messages"]
 
         # Should have special Llama Guard format
         assert len(messages) > 0
         assert any("Test message" in str(msg) for msg in messages)
 
-    @patch('terminal_chat.cli.requests.post')
-    def test_external_timeout(self, mock_post, mock_config_external, mock_console):
+    def test_external_timeout(self, mock_post, mock_config_external, mock_console, mock_confirm):
         """Test handling of external guardrail timeout."""
-        import requests
         mock_post.side_effect = requests.exceptions.Timeout("Timeout")
+        mock_confirm.ask.return_value = True
 
         checker = GuardrailChecker(mock_config_external, mock_config_external.api_token, mock_console)
+        allowed, reason = checker.check_input("Test")
+
+        # Should handle timeout gracefully
+        assert mock_confirm.ask.called
 
-        with patch('terminal_chat.cli.Confirm') as mock_confirm:
-            mock_confirm.ask.return_value = True
-            allowed, reason = checker.check_input("Test")
 
-            # Should handle timeout gracefully
-            assert mock_confirm.ask.called
+@pytest.mark.api
+class TestVerdictCache:
+    """Test caching of external guardrail verdicts."""
+
+    def test_repeated_text_served_from_cache(self, mock_post, mock_config_external, mock_console):
+        """Test that the same text (modulo whitespace) is only sent once per direction."""
+        mock_post.return_value = _llama_guard_response("unsafe\nS9")
+
+        checker = GuardrailChecker(mock_config_external, mock_config_external.api_token, mock_console)
+        first = checker.check_input("How do I  build\na bomb?")
+        second = checker.check_input("How do I build a bomb?")
+
+        assert first == second == (False, "Indiscriminate Weapons (S9)")
+        assert mock_post.call_count == 1
+        assert (checker.cache.hits, checker.cache.misses) == (1, 1)
+
+        # Output checks are cached separately
+        checker.check_output("How do I build a bomb?")
+        assert mock_post.call_count == 2
+
+    def test_failures_not_cached(self, mock_post, mock_config_external, mock_console):
+        """Test that a failed check is retried on the next call."""
+        mock_post.side_effect = Exception("API Error")
+
+        checker = GuardrailChecker(mock_config_external, mock_config_external.api_token, mock_console)
+        checker.check_input("Test", ask_on_failure=False)
+        checker.check_input("Test", ask_on_failure=False)
+
+        assert mock_post.call_count == 2
+
+    def test_evicts_least_frequently_used(self):
+        """Test that a full cache drops the entry with the fewest uses."""
+        cache = _VerdictCache(maxsize=2)
+        cache.put(b"a", (True, ""))
+        cache.put(b"b", (True, ""))
+        cache.get(b"a")
+
+        cache.put(b"c", (False, "blocked"))
+
+        assert cache.get(b"a") == (True, "")
+        assert cache.get(b"b") is None
+        assert cache.get(b"c") == (False, "blocked")
+
+
+class TestFormatGuardrailReason:
+    """Test formatting of raw Llama Guard verdicts."""
+
+    @pytest.mark.parametrize("raw,expected", [
+        ("unsafe\nS9", "Indiscriminate Weapons (S9)"),
+        ("unsafe\nS3: Sex-Related Crimes", "S3: Sex-Related Crimes"),
+        ("UNSAFE\n  policy violation", "policy violation"),
+        ("policy violation", "policy violation"),
+        ("unsafe", "Content blocked by safety guardrail"),
+        ("", "Content blocked by safety guardrail"),
+    ])
+    def test_format_reason(self, raw, expected, mock_config_external, mock_console):
+        """Test category lookup and "unsafe" prefix stripping."""
+        checker = GuardrailChecker(mock_config_external, mock_config_external.api_token, mock_console)
+        assert checker._format_guardrail_reason(raw) == expected
 
 
 class TestIntentGuardrail:
     """Test intent-based guardrail mode."""
 
-    def test_parse_intent_appropriate(self, mock_console, mock_config_intent):
+    def test_parse_intent_appropriate(self, intent_checker):
         """Test parsing appropriate intent response."""
-        checker = GuardrailChecker(mock_config_intent, mock_config_intent.api_token, mock_console)
+        checker = intent_checker
 
         response = '''{"intent": "User asking about weather", "appropriate": true, "reason": ""}
 The weather today is sunny.'''
@@ -329,9 +360,9 @@ The weather today is sunny.'''
         assert "weather" in intent_summary.lower()
         assert "sunny" in actual_response
 
-    def test_parse_intent_inappropriate(self, mock_console, mock_config_intent):
+    def test_parse_intent_inappropriate(self, intent_checker):
         """Test parsing inappropriate intent response."""
-        checker = GuardrailChecker(mock_config_intent, mock_config_intent.api_token, mock_console)
+        checker = intent_checker
 
         response = '''{"intent": "User requesting harmful information", "appropriate": false, "reason": "Violates content policy"}
 '''
@@ -341,9 +372,9 @@ The weather today is sunny.'''
         assert allowed is False
         assert "harmful" in intent_summary.lower() or "policy" in intent_summary.lower()
 
-    def test_parse_intent_malformed_json(self, mock_console, mock_config_intent):
+    def test_parse_intent_malformed_json(self, intent_checker):
         """Test handling malformed JSON in intent response."""
-        checker = GuardrailChecker(mock_config_intent, mock_config_intent.api_token, mock_console)
+        checker = intent_checker
 
         response = '''This is not JSON
 Just a regular response.'''
@@ -354,9 +385,9 @@ Just a regular response.'''
         assert allowed is True  # Default to allowing
         assert "regular response" in actual_response or "not found" in intent_summary.lower()
 
-    def test_parse_intent_partial_json(self, mock_console, mock_config_intent):
+    def test_parse_intent_partial_json(self, intent_checker):
         """Test handling partial JSON in intent response."""
-        checker = GuardrailChecker(mock_config_intent, mock_config_intent.api_token, mock_console)
+        checker = intent_checker
 
         response = '''{"intent": "Incomplete'''
 
@@ -365,9 +396,9 @@ Just a regular response.'''
         # Should handle gracefully
         assert isinstance(allowed, bool)
 
-    def test_parse_intent_with_newlines(self, mock_console, mock_config_intent):
+    def test_parse_intent_with_newlines(self, intent_checker):
         """Test parsing intent response with embedded newlines."""
-        checker = GuardrailChecker(mock_config_intent, mock_config_intent.api_token, mock_console)
+        checker = intent_checker
 
         response = '''{"intent": "Multi-line\\nintent", "appropriate": true, "reason": ""}
 Response line 1
@@ -380,9 +411,9 @@ Response line 3'''
         assert "Response line 1" in actual_response
         assert "Response line 2" in actual_response
 
-    def test_parse_intent_json_in_middle(self, mock_console, mock_config_intent):
+    def test_parse_intent_json_in_middle(self, intent_checker):
         """Test extracting JSON from middle of response."""
-        checker = GuardrailChecker(mock_config_intent, mock_config_intent.api_token, mock_console)
+        checker = intent_checker
 
         response = '''Some preamble text
 {"intent": "User question", "appropriate": true, "reason": ""}
@@ -394,9 +425,22 @@ The actual answer follows.'''
         assert "actual answer" in actual_response.lower()
         assert "preamble" not in actual_response.lower()
 
-    def test_parse_intent_missing_fields(self, mock_console, mock_config_intent):
+    def test_parse_intent_braces_in_reason(self, intent_checker):
+        """Test that braces inside the JSON strings don't cut the object short."""
+        checker = intent_checker
+
+        response = '''{"intent": "Asks for {secret} data", "appropriate": false, "reason": "Mentions {credentials}"}
+'''
+
+        allowed, intent_summary, actual_response = checker.parse_intent_response(response)
+
+        assert allowed is False
+        assert intent_summary == "Asks for {secret} data. Reason: Mentions {credentials}"
+        assert actual_response == ""
+
+    def test_parse_intent_missing_fields(self, intent_checker):
         """Test handling JSON with missing required fields."""
-        checker = GuardrailChecker(mock_config_intent, mock_config_intent.api_token, mock_console)
+        checker = intent_checker
 
         # Missing 'appropriate' field
         response = '''{"intent": "Some intent", "reason": ""}
@@ -408,9 +452,9 @@ Response text'''
         assert isinstance(allowed, bool)
         assert isinstance(intent_summary, str)
 
-    def test_parse_intent_empty_response(self, mock_console, mock_config_intent):
+    def test_parse_intent_empty_response(self, intent_checker):
         """Test handling empty response."""
-        checker = GuardrailChecker(mock_config_intent, mock_config_intent.api_token, mock_console)
+        checker = intent_checker
 
         response = ""
 
@@ -420,21 +464,26 @@ Response text'''
         assert isinstance(intent_summary, str)
         assert actual_response == ""
 
-    @pytest.mark.parametrize("appropriate_value,expected_allowed", [
-        (True, True),
-        (False, False),
-        ("true", True),
-        ("false", False),
-        (1, True),
-        (0, False),
+    @pytest.mark.parametrize("response,expected_allowed", [
+        pytest.param(
+            f'{{"intent": "Test", "appropriate": {json.dumps(value)}, "reason": ""}}\nResponse',
+            expected,
+            id=f"{value!r}-{expected}",
+        )
+        for value, expected in [
+            (True, True),
+            (False, False),
+            ("true", True),
+            ("false", False),
+            ("False", False),
+            ("no", False),
+            (1, True),
+            (0, False),
+        ]
     ])
-    def test_parse_intent_boolean_variations(self, mock_config_intent, appropriate_value, expected_allowed):
+    def test_parse_intent_boolean_variations(self, intent_checker, response, expected_allowed):
         """Test handling various boolean representations."""
-        checker = GuardrailChecker(mock_config_intent, mock_config_intent.api_token, mock_console)
-
-        response = f'{{"intent": "Test", "appropriate": {json.dumps(appropriate_value)}, "reason": ""}}\nResponse'
-
-        allowed, intent_summary, actual_response = checker.parse_intent_response(response)
+        allowed, intent_summary, actual_response = intent_checker.parse_intent_response(response)
 
         assert allowed == expected_allowed
 
@@ -442,38 +491,31 @@ Response text'''
 class TestGuardrailEdgeCases:
     """Test edge cases in guardrail checking."""
 
-    def test_empty_input(self, mock_config_system, mock_console):
+    def test_empty_input(self, system_checker):
         """Test checking empty input."""
-        checker = GuardrailChecker(mock_config_system, mock_config_system.api_token, mock_console)
+        checker = system_checker
 
         allowed, reason = checker.check_input("")
         assert allowed is True
 
-    def test_very_long_input(self, mock_config_system, mock_console):
+    def test_very_long_input(self, system_checker):
         """Test checking very long input."""
-        checker = GuardrailChecker(mock_config_system, mock_config_system.api_token, mock_console)
+        checker = system_checker
 
-        long_text = "A" * 100000
-        allowed, reason = checker.check_input(long_text)
+        allowed, reason = checker.check_input(_LONG_INPUT)
         assert allowed is True
 
-    def test_unicode_input(self, mock_config_system, mock_console):
+    def test_unicode_input(self, system_checker):
         """Test checking unicode input."""
-        checker = GuardrailChecker(mock_config_system, mock_config_system.api_token, mock_console)
+        checker = system_checker
 
         unicode_text = "你好 🎉 Здравствуйте مرحبا"
         allowed, reason = checker.check_input(unicode_text)
         assert allowed is True
 
-    @patch('terminal_chat.cli.requests.post')
     def test_special_characters_in_external(self, mock_post, mock_config_external, mock_console):
         """Test special characters with external guardrail."""
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "choices": [{"message": {"content": "safe"}}]
-        }
-        mock_post.return_value = mock_response
+        mock_post.return_value = _llama_guard_response("safe")
 
         checker = GuardrailChecker(mock_config_external, mock_config_external.api_token, mock_console)
         text = "Test with special chars: @#$%^&*()"
@@ -504,15 +546,9 @@ class TestGuardrailModeTransitions:
         assert system_checker.check_input("Test")[0] is True
         assert none_checker.check_input("Test")[0] is True
 
-    @patch('terminal_chat.cli.requests.post')
     def test_mode_affects_api_calls(self, mock_post):
         """Test that mode determines whether API is called."""
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "choices": [{"message": {"content": "safe"}}]
-        }
-        mock_post.return_value = mock_response
+        mock_post.return_value = _llama_guard_response("safe")
 
         # System mode - no API calls
         system_config = Mock()
@@ -1,40 +1,50 @@
 """
 Integration tests for end-to-end workflows.
 """
+import functools
+import json
 import pytest
+import requests
+import threading
+from types import SimpleNamespace
 from unittest.mock import Mock, patch, MagicMock
-from terminal_chat.cli import TerminalChat, Config
-from tests.conftest import create_config_file
+from terminal_chat import cli
+
+class _ReplayResponse:
+    """A 200 streaming response whose iter_lines() replays the same lines on every call."""
+
+    __slots__ = ("_lines",)
+    status_code = 200
+
+    def __init__(self, lines):
+        self._lines = lines
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self._lines)
+
+    def close(self):
+        pass
+
+
+@functools.lru_cache(maxsize=None)
+def _stream_response(content=None):
+    """The shared reply streaming one delta carrying content (if given) and then [DONE]."""
+    # iter_lines() yields lines without their terminators
+    lines = [b'data: [DONE]']
+    if content is not None:
+        lines.insert(0, f'data: {json.dumps({"choices": [{"delta": {"content": content}}]})}'.encode())
+    return _ReplayResponse(tuple(lines))
 
 
 class TestEndToEndWorkflows:
     """Test complete end-to-end workflows."""
 
-    @patch('terminal_chat.cli.requests.post')
-    @patch('terminal_chat.cli.PromptSession')
-    def test_simple_conversation_flow(self, mock_prompt_session, mock_post,
-                                       temp_home, mock_keyring, clean_env):
+    @patch.object(requests.Session, 'post')
+    @patch.object(cli, 'PromptSession')
+    def test_simple_conversation_flow(self, mock_prompt_session, mock_post, make_chat):
         """Test a simple conversation workflow."""
-        # Setup config
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test",
-            GUARDRAIL="none",
-            SHOW_COST="false"
-        )
-
         # Mock API response
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.iter_lines = Mock(
-            return_value=[
-                b'data: {"choices": [{"delta": {"content": "Hello!"}}]}\n\n',
-                b'data: [DONE]\n\n'
-            ]
-        )
-        mock_post.return_value = mock_response
+        mock_post.return_value = _stream_response("Hello!")
 
         # Mock user input: one message then exit
         mock_session = Mock()
@@ -42,51 +52,30 @@ class TestEndToEndWorkflows:
         mock_prompt_session.return_value = mock_session
 
         # Run chat
-        chat = TerminalChat()
+        chat = make_chat(GUARDRAIL="none", SHOW_COST="false")
         chat.chat()
 
         # Verify conversation happened
         assert mock_post.called
-        assert len(chat.conversation.get_messages()) > 0
+        assert chat.conversation.get_messages()[-1] == {"role": "assistant", "content": "Hello!"}
 
-    @patch('terminal_chat.cli.requests.post')
-    @patch('terminal_chat.cli.PromptSession')
-    def test_conversation_with_guardrail(self, mock_prompt_session, mock_post,
-                                          temp_home, mock_keyring, clean_env):
+    @patch.object(requests.Session, 'post')
+    @patch.object(cli, 'PromptSession')
+    def test_conversation_with_guardrail(self, mock_prompt_session, mock_post, make_chat):
         """Test conversation with guardrail enabled."""
-        # Setup config with guardrail
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test",
-            GUARDRAIL="external",
-            EXTERNAL_GUARDRAIL_CHECK_DIRECTIONS="both"
-        )
-
         # Mock guardrail check (safe)
         # Mock chat response
         def mock_post_side_effect(*args, **kwargs):
             url = args[0]
-            if "llama-guard" in str(kwargs.get('json', {}).get('model', '')):
+            if "llama-guard" in json.loads(kwargs['data'])['model']:
                 # Guardrail response
-                mock_resp = Mock()
-                mock_resp.status_code = 200
-                mock_resp.json.return_value = {
-                    "choices": [{"message": {"content": "safe"}}]
-                }
-                return mock_resp
+                return SimpleNamespace(
+                    status_code=200,
+                    content=json.dumps({"choices": [{"message": {"content": "safe"}}]}).encode()
+                )
             else:
                 # Chat response
-                mock_resp = Mock()
-                mock_resp.status_code = 200
-                mock_resp.iter_lines = Mock(
-                    return_value=[
-                        b'data: {"choices": [{"delta": {"content": "Response"}}]}\n\n',
-                        b'data: [DONE]\n\n'
-                    ]
-                )
-                return mock_resp
+                return _stream_response("Response")
 
         mock_post.side_effect = mock_post_side_effect
 
@@ -96,42 +85,62 @@ class TestEndToEndWorkflows:
         mock_prompt_session.return_value = mock_session
 
         # Run chat
-        chat = TerminalChat()
+        chat = make_chat(GUARDRAIL="external", EXTERNAL_GUARDRAIL_CHECK_DIRECTIONS="both")
         chat.chat()
 
         # Guardrail should have been called
         assert mock_post.call_count >= 2  # Guardrail + Chat
 
-    @patch('terminal_chat.cli.requests.post')
-    @patch('terminal_chat.cli.PromptSession')
-    def test_clear_command(self, mock_prompt_session, mock_post,
-                           temp_home, mock_keyring, clean_env):
-        """Test /clear command clears conversation."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test",
-            GUARDRAIL="none"
-        )
+    @patch.object(requests.Session, 'post')
+    @patch.object(cli, 'PromptSession')
+    def test_block_after_stream_counts_usage(self, mock_prompt_session, mock_post, make_chat):
+        """Test that a turn blocked only after its stream finished still tracks the reported usage."""
+        usage = {"prompt_tokens": 10, "completion_tokens": 20, "total_tokens": 30}
+        stream_done = threading.Event()
+
+        def chat_lines(decode_unicode=False):
+            # OpenRouter reports usage in the final frame, just before [DONE]
+            yield f'data: {json.dumps({"choices": [{"delta": {"content": "Hi"}}]})}'.encode()
+            yield f'data: {json.dumps({"choices": [], "usage": usage})}'.encode()
+            yield b'data: [DONE]'
+            stream_done.set()
+
+        def mock_post_side_effect(*args, **kwargs):
+            if "llama-guard" in json.loads(kwargs['data'])['model']:
+                # The verdict lands only once the whole response has streamed
+                assert stream_done.wait(5)
+                return SimpleNamespace(
+                    status_code=200,
+                    content=json.dumps({"choices": [{"message": {"content": "unsafe\nS1"}}]}).encode()
+                )
+            return SimpleNamespace(status_code=200, iter_lines=chat_lines, close=lambda: None)
+
+        mock_post.side_effect = mock_post_side_effect
+
+        mock_session = Mock()
+        mock_session.prompt.side_effect = ["Test message", "quit"]
+        mock_prompt_session.return_value = mock_session
+
+        chat = make_chat(GUARDRAIL="external", EXTERNAL_GUARDRAIL_CHECK_DIRECTIONS="input", SHOW_COST="true")
+        chat.chat()
 
+        assert all(m["role"] != "user" for m in chat.conversation.get_messages())
+        assert chat.cost_tracker.total_input_tokens == 10
+        assert chat.cost_tracker.total_output_tokens == 20
+
+    @patch.object(requests.Session, 'post')
+    @patch.object(cli, 'PromptSession')
+    def test_clear_command(self, mock_prompt_session, mock_post, make_chat):
+        """Test /clear command clears conversation."""
         # Mock API response
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.iter_lines = Mock(
-            return_value=[
-                b'data: {"choices": [{"delta": {"content": "Hi"}}]}\n\n',
-                b'data: [DONE]\n\n'
-            ]
-        )
-        mock_post.return_value = mock_response
+        mock_post.return_value = _stream_response("Hi")
 
         # User: message, /clear, exit
         mock_session = Mock()
         mock_session.prompt.side_effect = ["Hello", "/clear", "exit"]
         mock_prompt_session.return_value = mock_session
 
-        chat = TerminalChat()
+        chat = make_chat(GUARDRAIL="none")
         chat.chat()
 
         # After /clear, conversation should be empty (or just system)
@@ -144,104 +153,44 @@ class TestEndToEndWorkflows:
 class TestConfigurationIntegration:
     """Test configuration affects behavior correctly."""
 
-    @patch('terminal_chat.cli.requests.post')
-    @patch('terminal_chat.cli.PromptSession')
-    def test_render_markdown_affects_display(self, mock_prompt_session, mock_post,
-                                             temp_home, mock_keyring, clean_env):
-        """Test that RENDER_MARKDOWN config affects display."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test",
-            RENDER_MARKDOWN="false",
-            GUARDRAIL="none"
-        )
-
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.iter_lines = Mock(
-            return_value=[
-                b'data: {"choices": [{"delta": {"content": "Test"}}]}\n\n',
-                b'data: [DONE]\n\n'
-            ]
-        )
-        mock_post.return_value = mock_response
-
-        mock_session = Mock()
-        mock_session.prompt.side_effect = ["Test", "exit"]
-        mock_prompt_session.return_value = mock_session
-
-        chat = TerminalChat()
-        assert chat.config.render_markdown is False
+    @pytest.mark.parametrize("settings,check", [
+        ({"RENDER_MARKDOWN": "false"}, lambda chat, sent: chat.config.render_markdown is False),
+        ({"MAX_TOKENS": "2048"}, lambda chat, sent: json.loads(sent[-1]["data"])["max_tokens"] == 2048),
+    ], ids=["render_markdown", "max_tokens"])
+    @patch.object(cli, 'PromptSession')
+    def test_setting_reaches_chat(self, mock_prompt_session, monkeypatch, make_chat, settings, check):
+        """Test that a configured setting takes effect through a chat turn."""
+        sent = []  # Keyword arguments of each Session.post call
 
-        chat.chat()
+        def post(session, url, **kwargs):
+            sent.append(kwargs)
+            return _stream_response("Test")
 
-    @patch('terminal_chat.cli.requests.post')
-    @patch('terminal_chat.cli.PromptSession')
-    def test_max_tokens_passed_to_api(self, mock_prompt_session, mock_post,
-                                      temp_home, mock_keyring, clean_env):
-        """Test that MAX_TOKENS is passed to API."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test",
-            MAX_TOKENS="2048",
-            GUARDRAIL="none"
-        )
-
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.iter_lines = Mock(
-            return_value=[b'data: [DONE]\n\n']
-        )
-        mock_post.return_value = mock_response
+        monkeypatch.setattr(requests.Session, "post", post)
 
         mock_session = Mock()
         mock_session.prompt.side_effect = ["Test", "exit"]
         mock_prompt_session.return_value = mock_session
 
-        chat = TerminalChat()
+        chat = make_chat(GUARDRAIL="none", **settings)
         chat.chat()
 
-        # Verify max_tokens in API call
-        call_args = mock_post.call_args
-        if call_args:
-            json_data = call_args[1].get("json", {})
-            assert json_data.get("max_tokens") == 2048
+        assert sent
+        assert check(chat, sent)
 
 
 class TestErrorRecovery:
     """Test error recovery and resilience."""
 
-    @patch('terminal_chat.cli.requests.post')
-    @patch('terminal_chat.cli.PromptSession')
-    def test_api_error_recovery(self, mock_prompt_session, mock_post,
-                                temp_home, mock_keyring, clean_env):
+    @patch.object(requests.Session, 'post')
+    @patch.object(cli, 'PromptSession')
+    def test_api_error_recovery(self, mock_prompt_session, mock_post, make_chat):
         """Test that chat recovers from API errors."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test",
-            GUARDRAIL="none"
-        )
-
         # First call fails, second succeeds
-        mock_fail = Mock()
-        mock_fail.status_code = 500
-        mock_fail.text = '{"error": {"message": "Server error"}}'
-        mock_fail.raise_for_status.side_effect = Exception("500")
-
-        mock_success = Mock()
-        mock_success.status_code = 200
-        mock_success.iter_lines = Mock(
-            return_value=[
-                b'data: {"choices": [{"delta": {"content": "OK"}}]}\n\n',
-                b'data: [DONE]\n\n'
-            ]
-        )
+        error_body = '{"error": {"message": "Server error"}}'
+        mock_fail = SimpleNamespace(status_code=500, text=error_body, json=lambda: json.loads(error_body))
+
+        mock_success = _stream_response("OK")
 
         mock_post.side_effect = [mock_fail, mock_success]
 
@@ -249,7 +198,7 @@ class TestErrorRecovery:
         mock_session.prompt.side_effect = ["First", "Second", "exit"]
         mock_prompt_session.return_value = mock_session
 
-        chat = TerminalChat()
+        chat = make_chat(GUARDRAIL="none")
 
         # Should handle error and continue
         try:
@@ -257,22 +206,44 @@ class TestErrorRecovery:
         except:
             pass  # May raise, but shouldn't crash
 
-    @patch('terminal_chat.cli.PromptSession')
-    def test_keyboard_interrupt_handling(self, mock_prompt_session,
-                                         temp_home, mock_keyring, clean_env):
-        """Test handling of KeyboardInterrupt."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test"
-        )
+    @pytest.mark.parametrize("verdict,kept", [
+        ("unsafe\nS1", False),
+        ("safe", True),
+    ], ids=["unsafe", "safe"])
+    @patch.object(requests.Session, 'post')
+    @patch.object(cli, 'PromptSession')
+    def test_api_error_during_input_check(self, mock_prompt_session, mock_post, make_chat, verdict, kept):
+        """Test that an API error leaves the user message in history only if the input check passed."""
+        error_body = '{"error": {"message": "Server error"}}'
+
+        def mock_post_side_effect(*args, **kwargs):
+            if "llama-guard" in json.loads(kwargs['data'])['model']:
+                return SimpleNamespace(
+                    status_code=200,
+                    content=json.dumps({"choices": [{"message": {"content": verdict}}]}).encode()
+                )
+            return SimpleNamespace(status_code=500, text=error_body, json=lambda: json.loads(error_body))
+
+        mock_post.side_effect = mock_post_side_effect
+
+        mock_session = Mock()
+        mock_session.prompt.side_effect = ["Test message", "quit"]
+        mock_prompt_session.return_value = mock_session
+
+        chat = make_chat(GUARDRAIL="external", EXTERNAL_GUARDRAIL_CHECK_DIRECTIONS="input")
+        chat.chat()
+
+        user_messages = [m["content"] for m in chat.conversation.get_messages() if m["role"] == "user"]
+        assert user_messages == (["Test message"] if kept else [])
 
+    @patch.object(cli, 'PromptSession')
+    def test_keyboard_interrupt_handling(self, mock_prompt_session, make_chat):
+        """Test handling of KeyboardInterrupt."""
         mock_session = Mock()
         mock_session.prompt.side_effect = KeyboardInterrupt()
         mock_prompt_session.return_value = mock_session
 
-        chat = TerminalChat()
+        chat = make_chat()
 
         # Should handle gracefully
         result = chat.chat()
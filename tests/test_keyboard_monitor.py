@@ -1,45 +1,106 @@
 """
 Tests for KeyboardMonitor class (Unix/macOS only).
 """
-import time
-from unittest.mock import Mock, patch, call
+import sys
+import select
+from types import SimpleNamespace
+from unittest.mock import Mock
 import pytest
 from terminal_chat.cli import KeyboardMonitor
 
+# The Unix monitor path needs termios; skip the whole module where it doesn't exist (Windows)
+termios = pytest.importorskip("termios")
+
+
+_real_select = select.select
+
+
+def _wake_fds(rlist):
+    """The monitor's wakeup pipe out of a select() read list (stdin is the one non-int entry)."""
+    return [fd for fd in rlist if isinstance(fd, int)]
+
+
+def _idle_select(rlist, wlist, xlist):
+    """Block like a terminal nobody types into: return only once stop() closes the wakeup pipe."""
+    return _real_select(_wake_fds(rlist), [], [])
+
+
+@pytest.fixture(scope="module")
+def _unix_tty_patches():
+    """Pose as macOS with stdin a terminal, patching select, termios, tty and stdin once for the module."""
+    mocks = SimpleNamespace(
+        pending=None,  # Iterator of scripted select() results, or None to idle
+        tcgetattr=Mock(),
+        tcsetattr=Mock(),
+        setcbreak=Mock(),
+        stdin=Mock(),
+    )
+
+    def script(*results):
+        """Make select() return (or raise) each of results in turn, then report the wakeup pipe so the thread exits."""
+        mocks.pending = iter(results)
+
+    mocks.script = script
+
+    def fake_select(rlist, wlist, xlist):
+        if mocks.pending is None:
+            return _idle_select(rlist, wlist, xlist)
+        result = next(mocks.pending, None)
+        if result is None:
+            return _wake_fds(rlist), [], []
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(sys, "platform", "darwin")
+        mp.setattr("terminal_chat.cli.select.select", fake_select)
+        mp.setattr("terminal_chat.cli.termios.tcgetattr", mocks.tcgetattr)
+        mp.setattr("terminal_chat.cli.termios.tcsetattr", mocks.tcsetattr)
+        mp.setattr("terminal_chat.cli.tty.setcbreak", mocks.setcbreak)
+        mp.setattr(sys, "stdin", mocks.stdin)
+        yield mocks
+
+
+@pytest.fixture
+def unix_tty(_unix_tty_patches):
+    """The module's tty mocks, reset to a terminal with no pending input; returns them for tests to configure."""
+    mocks = _unix_tty_patches
+    for mock in (mocks.tcgetattr, mocks.tcsetattr, mocks.setcbreak, mocks.stdin):
+        mock.reset_mock(return_value=True, side_effect=True)
+    mocks.tcgetattr.return_value = [0] * 7
+    mocks.stdin.fileno.return_value = 0
+    mocks.pending = None
+    return mocks
+
+
+@pytest.fixture(scope="module")
+def idle_monitor():
+    """A never-started monitor shared by the tests in this module; stop() on it leaves it idle."""
+    return KeyboardMonitor()
+
 
 class TestKeyboardMonitorInit:
     """Test KeyboardMonitor initialization."""
 
-    def test_init_state(self):
+    def test_init_state(self, idle_monitor):
         """Test initial state of KeyboardMonitor."""
-        monitor = KeyboardMonitor()
+        monitor = idle_monitor
 
         assert monitor.interrupted is False
         assert monitor.monitoring is False
         assert monitor.thread is None
 
-    def test_is_interrupted_initial(self):
+    def test_is_interrupted_initial(self, idle_monitor):
         """Test is_interrupted returns False initially."""
-        monitor = KeyboardMonitor()
-        assert monitor.is_interrupted() is False
+        assert idle_monitor.is_interrupted() is False
 
 
 class TestKeyboardMonitorUnix:
     """Test KeyboardMonitor Unix-specific functionality."""
 
-    @patch('sys.platform', 'darwin')
-    @patch('terminal_chat.cli.select.select')
-    @patch('terminal_chat.cli.termios.tcgetattr')
-    @patch('terminal_chat.cli.termios.tcsetattr')
-    @patch('terminal_chat.cli.tty.setcbreak')
-    @patch('sys.stdin')
-    def test_start_monitoring_unix(self, mock_stdin, mock_setcbreak, mock_tcsetattr,
-                                   mock_tcgetattr, mock_select):
+    def test_start_monitoring_unix(self, unix_tty):
         """Test starting monitoring on Unix."""
-        mock_stdin.fileno.return_value = 0
-        mock_tcgetattr.return_value = [0, 0, 0, 0, 0, 0, []]
-        mock_select.return_value = ([], [], [])  # No input
-
         monitor = KeyboardMonitor()
         monitor.start()
 
@@ -49,25 +110,11 @@ class TestKeyboardMonitorUnix:
 
         monitor.stop()
 
-    @patch('sys.platform', 'darwin')
-    @patch('terminal_chat.cli.select.select')
-    @patch('terminal_chat.cli.termios.tcgetattr')
-    @patch('terminal_chat.cli.termios.tcsetattr')
-    @patch('terminal_chat.cli.tty.setcbreak')
-    @patch('sys.stdin')
-    def test_stop_monitoring_unix(self, mock_stdin, mock_setcbreak, mock_tcsetattr,
-                                  mock_tcgetattr, mock_select):
+    def test_stop_monitoring_unix(self, unix_tty):
         """Test stopping monitoring on Unix."""
-        mock_stdin.fileno.return_value = 0
-        mock_tcgetattr.return_value = [0, 0, 0, 0, 0, 0, []]
-        mock_select.return_value = ([], [], [])
-
         monitor = KeyboardMonitor()
         monitor.start()
 
-        # Give thread time to start
-        time.sleep(0.1)
-
         monitor.stop()
 
         assert monitor.monitoring is False
@@ -75,166 +122,114 @@ class TestKeyboardMonitorUnix:
         monitor.thread.join(timeout=1.0)
         assert not monitor.thread.is_alive()
 
-    @patch('sys.platform', 'darwin')
-    @patch('terminal_chat.cli.select.select')
-    @patch('terminal_chat.cli.termios.tcgetattr')
-    @patch('terminal_chat.cli.termios.tcsetattr')
-    @patch('terminal_chat.cli.tty.setcbreak')
-    @patch('sys.stdin')
-    def test_esc_key_detection_unix(self, mock_stdin, mock_setcbreak, mock_tcsetattr,
-                                    mock_tcgetattr, mock_select):
+    def test_esc_key_detection_unix(self, unix_tty):
         """Test ESC key detection on Unix."""
-        mock_stdin.fileno.return_value = 0
-        mock_stdin.read.return_value = '\x1b'  # ESC key
-        mock_tcgetattr.return_value = [0, 0, 0, 0, 0, 0, []]
+        unix_tty.stdin.read.return_value = '\x1b'  # ESC key
 
         # First call: input available, second call: no input
-        mock_select.side_effect = [
-            ([mock_stdin], [], []),  # ESC available
+        unix_tty.script(
+            ([unix_tty.stdin], [], []),  # ESC available
             ([], [], [])             # No more input
-        ]
+        )
 
         monitor = KeyboardMonitor()
         monitor.start()
 
-        # Give thread time to detect ESC
-        time.sleep(0.2)
+        # The thread exits once it has seen ESC
+        monitor.thread.join(timeout=1.0)
 
         assert monitor.is_interrupted() is True
         assert monitor.interrupted is True
 
         monitor.stop()
 
-    @patch('sys.platform', 'darwin')
-    @patch('terminal_chat.cli.select.select')
-    @patch('terminal_chat.cli.termios.tcgetattr')
-    @patch('terminal_chat.cli.termios.tcsetattr')
-    @patch('terminal_chat.cli.tty.setcbreak')
-    @patch('sys.stdin')
-    def test_non_esc_key_ignored_unix(self, mock_stdin, mock_setcbreak, mock_tcsetattr,
-                                      mock_tcgetattr, mock_select):
+    def test_non_esc_key_ignored_unix(self, unix_tty):
         """Test that non-ESC keys are ignored on Unix."""
-        mock_stdin.fileno.return_value = 0
-        mock_stdin.read.return_value = 'a'  # Regular key
-        mock_tcgetattr.return_value = [0, 0, 0, 0, 0, 0, []]
+        unix_tty.stdin.read.return_value = 'a'  # Regular key
 
         # Input available then stop
-        mock_select.side_effect = [
-            ([mock_stdin], [], []),
+        unix_tty.script(
+            ([unix_tty.stdin], [], []),
             ([], [], [])
-        ]
+        )
 
         monitor = KeyboardMonitor()
         monitor.start()
 
-        time.sleep(0.2)
+        monitor.thread.join(timeout=1.0)
 
         assert monitor.is_interrupted() is False
 
         monitor.stop()
 
-    @patch('sys.platform', 'darwin')
-    @patch('terminal_chat.cli.select.select')
-    @patch('terminal_chat.cli.termios.tcgetattr')
-    @patch('terminal_chat.cli.termios.tcsetattr')
-    @patch('terminal_chat.cli.tty.setcbreak')
-    @patch('sys.stdin')
-    def test_terminal_settings_restored_unix(self, mock_stdin, mock_setcbreak,
-                                            mock_tcsetattr, mock_tcgetattr, mock_select):
+    def test_terminal_settings_restored_unix(self, unix_tty):
         """Test that terminal settings are restored on Unix."""
-        mock_stdin.fileno.return_value = 0
         old_settings = [1, 2, 3, 4, 5, 6, [7, 8]]
-        mock_tcgetattr.return_value = old_settings
-        mock_select.return_value = ([], [], [])
+        unix_tty.tcgetattr.return_value = old_settings
 
         monitor = KeyboardMonitor()
         monitor.start()
 
-        time.sleep(0.1)
-
         monitor.stop()
         monitor.thread.join(timeout=1.0)
 
         # Terminal settings should be restored
         # tcsetattr should be called with old_settings
-        assert mock_tcsetattr.call_count >= 1
-
-    @patch('sys.platform', 'darwin')
-    def test_multiple_start_calls(self, mock_platform):
-        """Test that multiple start() calls don't create multiple threads."""
-        with patch('terminal_chat.cli.select.select', return_value=([], [], [])), \
-             patch('terminal_chat.cli.termios.tcgetattr', return_value=[0]*7), \
-             patch('terminal_chat.cli.termios.tcsetattr'), \
-             patch('terminal_chat.cli.tty.setcbreak'), \
-             patch('sys.stdin.fileno', return_value=0):
-
-            monitor = KeyboardMonitor()
+        assert unix_tty.tcsetattr.call_count >= 1
 
-            monitor.start()
-            first_thread = monitor.thread
+    def test_multiple_start_calls(self, unix_tty):
+        """Test that a second start() stops the running thread and replaces it."""
+        monitor = KeyboardMonitor()
 
-            monitor.start()  # Second start
-            second_thread = monitor.thread
+        monitor.start()
+        first_thread = monitor.thread
 
-            # Should be the same thread (or at least not create new one while running)
-            assert first_thread is not None
+        monitor.start()  # Second start
+        second_thread = monitor.thread
 
+        try:
+            first_thread.join(1.0)
+            assert not first_thread.is_alive()
+            assert second_thread is not first_thread
+            assert second_thread.is_alive()
+        finally:
             monitor.stop()
 
-    @patch('sys.platform', 'darwin')
-    def test_stop_without_start(self):
+    def test_stop_without_start(self, unix_tty, idle_monitor):
         """Test that stop() works even if start() was never called."""
-        monitor = KeyboardMonitor()
+        monitor = idle_monitor
         monitor.stop()  # Should not raise exception
 
         assert monitor.monitoring is False
 
-    @patch('sys.platform', 'darwin')
-    @patch('terminal_chat.cli.select.select')
-    @patch('terminal_chat.cli.termios.tcgetattr')
-    @patch('terminal_chat.cli.termios.tcsetattr')
-    @patch('terminal_chat.cli.tty.setcbreak')
-    @patch('sys.stdin')
-    def test_exception_in_monitor_thread(self, mock_stdin, mock_setcbreak,
-                                         mock_tcsetattr, mock_tcgetattr, mock_select):
+    def test_exception_in_monitor_thread(self, unix_tty):
         """Test that exceptions in monitor thread don't crash."""
-        mock_stdin.fileno.return_value = 0
-        mock_tcgetattr.return_value = [0]*7
-        mock_select.side_effect = Exception("Test exception")
+        unix_tty.script(Exception("Test exception"))
 
         monitor = KeyboardMonitor()
         monitor.start()
 
-        time.sleep(0.2)
+        monitor.thread.join(timeout=1.0)
 
         # Thread should handle exception gracefully
         monitor.stop()
 
-    @patch('sys.platform', 'darwin')
-    @patch('terminal_chat.cli.select.select')
-    @patch('terminal_chat.cli.termios.tcgetattr')
-    @patch('terminal_chat.cli.termios.tcsetattr')
-    @patch('terminal_chat.cli.tty.setcbreak')
-    @patch('sys.stdin')
-    def test_rapid_esc_presses(self, mock_stdin, mock_setcbreak, mock_tcsetattr,
-                               mock_tcgetattr, mock_select):
+    def test_rapid_esc_presses(self, unix_tty):
         """Test handling of rapid ESC key presses."""
-        mock_stdin.fileno.return_value = 0
-        mock_stdin.read.return_value = '\x1b'
-        mock_tcgetattr.return_value = [0]*7
+        unix_tty.stdin.read.return_value = '\x1b'
 
         # Multiple ESC inputs
-        mock_select.side_effect = [
-            ([mock_stdin], [], []),
-            ([mock_stdin], [], []),
-            ([mock_stdin], [], []),
+        unix_tty.script(
+            ([unix_tty.stdin], [], []),
+            ([unix_tty.stdin], [], []),
+            ([unix_tty.stdin], [], []),
             ([], [], [])
-        ]
+        )
 
         monitor = KeyboardMonitor()
         monitor.start()
 
-        time.sleep(0.2)
+        monitor.thread.join(timeout=1.0)
 
         # Should still be interrupted (flag set once)
         assert monitor.is_interrupted() is True
@@ -245,50 +240,32 @@ class TestKeyboardMonitorUnix:
 class TestKeyboardMonitorThreadSafety:
     """Test thread safety of KeyboardMonitor."""
 
-    @patch('sys.platform', 'darwin')
-    def test_concurrent_is_interrupted_calls(self):
+    def test_concurrent_is_interrupted_calls(self, unix_tty):
         """Test that is_interrupted() can be called from multiple threads."""
-        with patch('terminal_chat.cli.select.select', return_value=([], [], [])), \
-             patch('terminal_chat.cli.termios.tcgetattr', return_value=[0]*7), \
-             patch('terminal_chat.cli.termios.tcsetattr'), \
-             patch('terminal_chat.cli.tty.setcbreak'), \
-             patch('sys.stdin.fileno', return_value=0):
-
-            monitor = KeyboardMonitor()
-            monitor.start()
+        monitor = KeyboardMonitor()
+        monitor.start()
 
-            # Call is_interrupted from multiple places
-            results = []
-            for _ in range(10):
-                results.append(monitor.is_interrupted())
+        # Call is_interrupted from multiple places
+        results = [monitor.is_interrupted() for _ in range(10)]
 
-            # All should return False (no ESC pressed)
-            assert all(r is False for r in results)
+        # All should return False (no ESC pressed)
+        assert results == [False] * 10
 
-            monitor.stop()
+        monitor.stop()
 
-    @patch('sys.platform', 'darwin')
-    @patch('terminal_chat.cli.select.select')
-    @patch('terminal_chat.cli.termios.tcgetattr')
-    @patch('terminal_chat.cli.termios.tcsetattr')
-    @patch('terminal_chat.cli.tty.setcbreak')
-    @patch('sys.stdin')
-    def test_interrupt_flag_persistence(self, mock_stdin, mock_setcbreak,
-                                        mock_tcsetattr, mock_tcgetattr, mock_select):
+    def test_interrupt_flag_persistence(self, unix_tty):
         """Test that interrupt flag persists until checked."""
-        mock_stdin.fileno.return_value = 0
-        mock_stdin.read.return_value = '\x1b'
-        mock_tcgetattr.return_value = [0]*7
+        unix_tty.stdin.read.return_value = '\x1b'
 
-        mock_select.side_effect = [
-            ([mock_stdin], [], []),
+        unix_tty.script(
+            ([unix_tty.stdin], [], []),
             ([], [], [])
-        ]
+        )
 
         monitor = KeyboardMonitor()
         monitor.start()
 
-        time.sleep(0.2)
+        monitor.thread.join(timeout=1.0)
 
         # Check multiple times - should remain True
         assert monitor.is_interrupted() is True
@@ -301,84 +278,44 @@ class TestKeyboardMonitorThreadSafety:
 class TestKeyboardMonitorCleanup:
     """Test cleanup behavior of KeyboardMonitor."""
 
-    @patch('sys.platform', 'darwin')
-    @patch('terminal_chat.cli.select.select')
-    @patch('terminal_chat.cli.termios.tcgetattr')
-    @patch('terminal_chat.cli.termios.tcsetattr')
-    @patch('terminal_chat.cli.tty.setcbreak')
-    @patch('sys.stdin')
-    def test_cleanup_on_stop(self, mock_stdin, mock_setcbreak, mock_tcsetattr,
-                            mock_tcgetattr, mock_select):
+    def test_cleanup_on_stop(self, unix_tty):
         """Test that stop() properly cleans up resources."""
-        mock_stdin.fileno.return_value = 0
-        mock_tcgetattr.return_value = [0]*7
-        mock_select.return_value = ([], [], [])
-
         monitor = KeyboardMonitor()
         monitor.start()
 
-        time.sleep(0.1)
-
         monitor.stop()
         monitor.thread.join(timeout=1.0)
 
         assert monitor.monitoring is False
         assert not monitor.thread.is_alive()
 
-    @patch('sys.platform', 'darwin')
-    @patch('terminal_chat.cli.select.select')
-    @patch('terminal_chat.cli.termios.tcgetattr')
-    @patch('terminal_chat.cli.termios.tcsetattr')
-    @patch('terminal_chat.cli.tty.setcbreak')
-    @patch('sys.stdin')
-    def test_start_stop_cycle(self, mock_stdin, mock_setcbreak, mock_tcsetattr,
-                             mock_tcgetattr, mock_select):
+    def test_start_stop_cycle(self, unix_tty):
         """Test multiple start/stop cycles."""
-        mock_stdin.fileno.return_value = 0
-        mock_tcgetattr.return_value = [0]*7
-        mock_select.return_value = ([], [], [])
-
         monitor = KeyboardMonitor()
 
-        # First cycle
-        monitor.start()
-        time.sleep(0.1)
-        monitor.stop()
-
-        # Second cycle
-        monitor.start()
-        time.sleep(0.1)
-        monitor.stop()
-
-        # Third cycle
-        monitor.start()
-        time.sleep(0.1)
-        monitor.stop()
+        # The same instance must come back up after each stop()
+        for _ in range(3):
+            monitor.start()
+            assert monitor.monitoring is True
+            assert monitor.thread.is_alive()
 
-        assert monitor.monitoring is False
+            monitor.stop()
+            assert monitor.monitoring is False
+            assert not monitor.thread.is_alive()
 
-    @patch('sys.platform', 'darwin')
-    @patch('terminal_chat.cli.select.select')
-    @patch('terminal_chat.cli.termios.tcgetattr')
-    @patch('terminal_chat.cli.termios.tcsetattr')
-    @patch('terminal_chat.cli.tty.setcbreak')
-    @patch('sys.stdin')
-    def test_reset_interrupt_flag(self, mock_stdin, mock_setcbreak, mock_tcsetattr,
-                                  mock_tcgetattr, mock_select):
+    def test_reset_interrupt_flag(self, unix_tty):
         """Test that interrupt flag can be manually reset."""
-        mock_stdin.fileno.return_value = 0
-        mock_stdin.read.return_value = '\x1b'
-        mock_tcgetattr.return_value = [0]*7
+        unix_tty.stdin.read.return_value = '\x1b'
 
-        mock_select.side_effect = [
-            ([mock_stdin], [], []),
+        unix_tty.script(
+            ([unix_tty.stdin], [], []),
             ([], [], [])
-        ]
+        )
 
         monitor = KeyboardMonitor()
         monitor.start()
 
-        time.sleep(0.2)
+        monitor.thread.join(timeout=1.0)
         assert monitor.is_interrupted() is True
 
         # Manually reset
@@ -387,3 +324,29 @@ class TestKeyboardMonitorCleanup:
         assert monitor.is_interrupted() is False
 
         monitor.stop()
+
+    def test_terminal_restored_after_join(self, unix_tty):
+        """Test that terminal setup happens in start() and restore in stop()."""
+        old_settings = [1, 2, 3, 4, 5, 6, [7, 8]]
+        unix_tty.tcgetattr.return_value = old_settings
+
+        monitor = KeyboardMonitor()
+        monitor.start()
+
+        unix_tty.setcbreak.assert_called_once_with(0)
+        unix_tty.tcsetattr.assert_not_called()
+
+        monitor.stop()
+
+        unix_tty.tcsetattr.assert_called_once_with(unix_tty.stdin, termios.TCSADRAIN, old_settings)
+
+    def test_start_without_terminal(self, unix_tty):
+        """Test that start() does not spawn a thread when stdin is not a terminal."""
+        unix_tty.tcgetattr.side_effect = OSError("not a tty")
+        monitor = KeyboardMonitor()
+        monitor.start()
+
+        assert monitor.monitoring is False
+        assert monitor.thread is None
+
+        monitor.stop()
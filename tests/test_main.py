@@ -1,144 +1,113 @@
 """
 Tests for main() entry point.
 """
+import subprocess
+import sys
 import pytest
-from unittest.mock import Mock, patch, call
+from types import SimpleNamespace
 from terminal_chat.cli import main
-from tests.conftest import create_config_file
+
+
+@pytest.fixture
+def fake_chat(monkeypatch):
+    """Stand in for Config and TerminalChat; records chat() calls and raises fake.raises when set."""
+    fake = SimpleNamespace(messages=[], raises=None)
+
+    def chat(initial_message=None):
+        fake.messages.append(initial_message)
+        if fake.raises is not None:
+            raise fake.raises
+
+    monkeypatch.setattr("terminal_chat.cli.Config", SimpleNamespace)
+    monkeypatch.setattr("terminal_chat.cli.TerminalChat", lambda config: SimpleNamespace(chat=chat))
+    return fake
+
+
+@pytest.fixture
+def fake_wizard(monkeypatch):
+    """Stand in for SetupWizard with one that always succeeds; returns the list of run() calls."""
+    runs = []
+
+    def run(migrate_existing=False):
+        runs.append(migrate_existing)
+        return True
+
+    monkeypatch.setattr("terminal_chat.cli.SetupWizard", lambda console: SimpleNamespace(run=run))
+    return runs
 
 
 class TestMainEntry:
     """Test main() entry point."""
 
-    @patch('terminal_chat.cli.TerminalChat')
-    @patch('terminal_chat.cli.Config')
-    def test_main_no_args(self, mock_config_class, mock_chat_class,
-                          temp_home, mock_keyring, clean_env):
+    def test_main_no_args(self, monkeypatch, fake_chat):
         """Test main with no arguments."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test"
-        )
+        monkeypatch.setattr(sys, "argv", ["ask"])
 
-        mock_config = Mock()
-        mock_config_class.return_value = mock_config
+        assert main() is None
+        assert fake_chat.messages == [None]
 
-        mock_chat = Mock()
-        mock_chat.chat.return_value = None
-        mock_chat_class.return_value = mock_chat
+    def test_main_with_message(self, monkeypatch, fake_chat):
+        """Test main with initial message."""
+        monkeypatch.setattr(sys, "argv", ["ask", "Hello", "world"])
 
-        with patch('sys.argv', ['ask']):
-            exit_code = main()
+        assert main() is None
+        assert fake_chat.messages == ["Hello world"]
 
-        assert exit_code == 0
-        mock_chat.chat.assert_called_once_with(None)
+    @pytest.mark.parametrize("flag", ["--setup", "-s"])
+    def test_main_setup_flag(self, monkeypatch, fake_chat, fake_wizard, flag):
+        """Test main with --setup / -s runs the wizard and exits without chatting."""
+        monkeypatch.setattr(sys, "argv", ["ask", flag])
 
-    @patch('terminal_chat.cli.TerminalChat')
-    @patch('terminal_chat.cli.Config')
-    def test_main_with_message(self, mock_config_class, mock_chat_class,
-                               temp_home, mock_keyring, clean_env):
-        """Test main with initial message."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test"
-        )
+        with pytest.raises(SystemExit) as exc_info:
+            main()
 
-        mock_config = Mock()
-        mock_config_class.return_value = mock_config
-
-        mock_chat = Mock()
-        mock_chat.chat.return_value = None
-        mock_chat_class.return_value = mock_chat
-
-        with patch('sys.argv', ['ask', 'Hello', 'world']):
-            exit_code = main()
-
-        assert exit_code == 0
-        mock_chat.chat.assert_called_once_with("Hello world")
-
-    @patch('terminal_chat.cli.SetupWizard')
-    def test_main_setup_flag(self, mock_wizard_class, temp_home):
-        """Test main with --setup flag."""
-        mock_wizard = Mock()
-        mock_wizard.run.return_value = True
-        mock_wizard_class.return_value = mock_wizard
-
-        with patch('sys.argv', ['ask', '--setup']):
-            with patch('terminal_chat.cli.Config'):
-                with patch('terminal_chat.cli.TerminalChat'):
-                    exit_code = main()
-
-        mock_wizard.run.assert_called_once()
-
-    @patch('terminal_chat.cli.SetupWizard')
-    def test_main_setup_short_flag(self, mock_wizard_class, temp_home):
-        """Test main with -s flag."""
-        mock_wizard = Mock()
-        mock_wizard.run.return_value = True
-        mock_wizard_class.return_value = mock_wizard
-
-        with patch('sys.argv', ['ask', '-s']):
-            with patch('terminal_chat.cli.Config'):
-                with patch('terminal_chat.cli.TerminalChat'):
-                    exit_code = main()
-
-        mock_wizard.run.assert_called_once()
-
-    @patch('terminal_chat.cli.Config')
-    def test_main_missing_config_triggers_setup(self, mock_config_class,
-                                                 temp_home, mock_keyring, clean_env):
-        """Test that missing config triggers setup wizard."""
-        mock_config_class.side_effect = SystemExit(1)
-
-        with patch('terminal_chat.cli.SetupWizard') as mock_wizard_class:
-            mock_wizard = Mock()
-            mock_wizard.run.return_value = True
-            mock_wizard_class.return_value = mock_wizard
-
-            with patch('sys.argv', ['ask']):
-                with patch('terminal_chat.cli.TerminalChat'):
-                    exit_code = main()
-
-            mock_wizard.run.assert_called_once()
-
-    def test_main_keyboard_interrupt(self, temp_home, mock_keyring, clean_env):
-        """Test handling KeyboardInterrupt."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test"
-        )
+        assert exc_info.value.code == 0
+        assert len(fake_wizard) == 1
+        assert fake_chat.messages == []
 
-        with patch('terminal_chat.cli.TerminalChat') as mock_chat_class:
-            mock_chat = Mock()
-            mock_chat.chat.side_effect = KeyboardInterrupt()
-            mock_chat_class.return_value = mock_chat
+    def test_main_missing_config_triggers_setup(self, monkeypatch, fake_chat, fake_wizard):
+        """Test that incomplete config triggers the setup wizard, then loads again."""
+        attempts = []
 
-            with patch('sys.argv', ['ask']):
-                exit_code = main()
+        def config():
+            attempts.append(None)
+            if len(attempts) == 1:
+                raise ValueError("Configuration incomplete")
+            return SimpleNamespace()
 
-            assert exit_code == 0
+        monkeypatch.setattr("terminal_chat.cli.Config", config)
+        monkeypatch.setattr(sys, "argv", ["ask"])
 
-    def test_main_generic_exception(self, temp_home, mock_keyring, clean_env):
-        """Test handling generic exceptions."""
-        config_path = temp_home / ".askrc"
-        create_config_file(
-            config_path,
-            LLM="anthropic/claude-haiku-4.5",
-            API_TOKEN="sk-test"
-        )
+        main()
+
+        assert len(fake_wizard) == 1
+        assert len(attempts) == 2
+        assert fake_chat.messages == [None]
 
-        with patch('terminal_chat.cli.TerminalChat') as mock_chat_class:
-            mock_chat = Mock()
-            mock_chat.chat.side_effect = Exception("Test error")
-            mock_chat_class.return_value = mock_chat
+    @pytest.mark.parametrize("error,expected_code", [
+        (KeyboardInterrupt(), 0),
+        (Exception("Test error"), 1),
+    ], ids=["keyboard_interrupt", "generic_exception"])
+    def test_main_chat_errors(self, monkeypatch, fake_chat, error, expected_code):
+        """Test that KeyboardInterrupt exits cleanly and other errors exit with 1."""
+        fake_chat.raises = error
+        monkeypatch.setattr(sys, "argv", ["ask"])
 
-            with patch('sys.argv', ['ask']):
-                exit_code = main()
+        with pytest.raises(SystemExit) as exc_info:
+            main()
 
-            assert exit_code == 1
+        assert exc_info.value.code == expected_code
+
+
+class TestStartupImports:
+    """Test that importing the CLI module stays cheap."""
+
+    def test_heavy_modules_not_imported_at_startup(self):
+        """Test that rich, keyring, requests and friends load on first use, not on import."""
+        lazy = ["rich", "keyring", "requests", "prompt_toolkit", "concurrent.futures", "hashlib"]
+        code = (
+            "import sys, terminal_chat.cli\n"
+            f"print([m for m in {lazy!r} if m in sys.modules])"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        assert result.stdout.strip() == "[]"
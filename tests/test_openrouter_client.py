@@ -1,12 +1,16 @@
 """
 Tests for OpenRouterClient class.
 """
+import io
 import json
 from unittest.mock import Mock, patch, MagicMock
 import pytest
 import requests
-from terminal_chat.cli import OpenRouterClient
-from tests.conftest import create_mock_stream_response
+from terminal_chat.cli import OpenRouterClient, _iter_sse_batches
+from tests.conftest import create_mock_stream_response, mock_iter_lines
+
+# iter_lines() yields lines without their terminators
+_DONE_LINES = (b'data: [DONE]',)
 
 
 class TestOpenRouterClientInit:
@@ -20,11 +24,30 @@ class TestOpenRouterClientInit:
         assert client.api_token == "sk-test-token"
         assert client.session is None
 
+    @patch.object(requests.Session, 'post')
+    def test_session_reused_across_requests(self, mock_post):
+        """Test that one HTTP session serves every turn until close()."""
+        mock_post.return_value = create_mock_stream_response(["Hi"])
+
+        client = OpenRouterClient("sk-test-token", "test-model")
+        list(client.chat_stream([{"role": "user", "content": "One"}]))
+        session = client.session
+
+        mock_post.return_value = create_mock_stream_response(["Hi"])
+        list(client.chat_stream([{"role": "user", "content": "Two"}]))
+
+        assert session is not None
+        assert client.session is session
+        assert mock_post.call_count == 2
+
+        client.close()
+        assert client.session is None
+
 
 class TestChatStream:
     """Test chat_stream method."""
 
-    @patch('terminal_chat.cli.requests.post')
+    @patch.object(requests.Session, 'post')
     def test_successful_stream(self, mock_post, api_responses):
         """Test successful streaming response."""
         # Create mock response
@@ -49,12 +72,13 @@ class TestChatStream:
         call_args = mock_post.call_args
 
         assert call_args[0][0] == "https://openrouter.ai/api/v1/chat/completions"
-        assert call_args[1]["headers"]["Authorization"] == "Bearer sk-test-token"
-        assert call_args[1]["json"]["model"] == "test-model"
-        assert call_args[1]["json"]["messages"] == messages
-        assert call_args[1]["json"]["stream"] is True
+        assert client.session.headers["Authorization"] == "Bearer sk-test-token"
+        payload = json.loads(call_args[1]["data"])
+        assert payload["model"] == "test-model"
+        assert payload["messages"] == messages
+        assert payload["stream"] is True
 
-    @patch('terminal_chat.cli.requests.post')
+    @patch.object(requests.Session, 'post')
     def test_stream_with_usage(self, mock_post):
         """Test extracting usage information from stream."""
         mock_response = Mock()
@@ -77,7 +101,26 @@ class TestChatStream:
         assert client.input_tokens == 10
         assert client.output_tokens == 20
 
-    @patch('terminal_chat.cli.requests.post')
+    @patch.object(requests.Session, 'post')
+    def test_usage_frame_with_empty_choices(self, mock_post):
+        """Test that a final usage frame with no choices is read, not rejected."""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.iter_lines = mock_iter_lines((
+            b'data: {"choices": [{"delta": {"content": "Hello"}}]}',
+            b'data: {"choices": [], "usage": {"prompt_tokens": 10, "completion_tokens": 20, "total_tokens": 30}}',
+            b'data: [DONE]',
+        ))
+        mock_post.return_value = mock_response
+
+        client = OpenRouterClient("sk-test-token", "test-model")
+
+        chunks = list(client.chat_stream([{"role": "user", "content": "Test"}]))
+
+        assert chunks == ["Hello"]
+        assert client.last_usage == {'prompt_tokens': 10, 'completion_tokens': 20, 'total_tokens': 30}
+
+    @patch.object(requests.Session, 'post')
     def test_stream_done_marker(self, mock_post):
         """Test handling of [DONE] marker."""
         mock_response = Mock()
@@ -99,7 +142,7 @@ class TestChatStream:
         assert len(chunks) > 0
         assert "[DONE]" not in "".join(chunks)
 
-    @patch('terminal_chat.cli.requests.post')
+    @patch.object(requests.Session, 'post')
     def test_stream_empty_chunks(self, mock_post):
         """Test handling of empty content in chunks."""
         mock_response = Mock()
@@ -124,7 +167,7 @@ class TestChatStream:
         assert "Hello" in content
         assert "World" in content
 
-    @patch('terminal_chat.cli.requests.post')
+    @patch.object(requests.Session, 'post')
     def test_stream_invalid_json(self, mock_post):
         """Test handling of invalid JSON in stream."""
         mock_response = Mock()
@@ -149,12 +192,12 @@ class TestChatStream:
         assert "Valid" in content
         assert "Text" in content
 
-    @patch('terminal_chat.cli.requests.post')
+    @patch.object(requests.Session, 'post')
     def test_stream_with_max_tokens(self, mock_post):
         """Test streaming with max_tokens parameter."""
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.iter_lines = Mock(return_value=[b'data: [DONE]\n\n'])
+        mock_response.iter_lines = mock_iter_lines(_DONE_LINES)
         mock_post.return_value = mock_response
 
         client = OpenRouterClient("sk-test-token", "test-model")
@@ -164,9 +207,9 @@ class TestChatStream:
 
         # Verify max_tokens in request
         call_args = mock_post.call_args
-        assert call_args[1]["json"]["max_tokens"] == 500
+        assert json.loads(call_args[1]["data"])["max_tokens"] == 500
 
-    @patch('terminal_chat.cli.requests.post')
+    @patch.object(requests.Session, 'post')
     def test_stream_multiline_content(self, mock_post):
         """Test streaming multiline content."""
         mock_response = Mock()
@@ -192,10 +235,62 @@ class TestChatStream:
         assert "Line 3" in content
 
 
+class TestRawStreamReading:
+    """Test reading the SSE body straight from the raw stream."""
+
+    def test_lines_split_across_reads(self):
+        """Test that lines spanning several read1() calls are reassembled."""
+        body = b'data: {"a": 1}\n\n: keepalive\r\ndata: [DONE]\n'
+        response = Mock(raw=io.BytesIO(body))
+
+        lines = [line for batch in _iter_sse_batches(response, chunk_size=5) for line in batch]
+
+        assert lines == [b'data: {"a": 1}', b'', b': keepalive', b'data: [DONE]']
+        response.iter_lines.assert_not_called()
+
+    def test_line_longer_than_many_reads(self):
+        """Test that a line spread over many reads comes out whole."""
+        payload = b'data: ' + b'x' * 1000
+        response = Mock(raw=io.BytesIO(payload + b'\ndata: [DONE]\n'))
+
+        assert list(_iter_sse_batches(response, chunk_size=7)) == [[payload], [b'data: [DONE]']]
+
+    def test_trailing_partial_line(self):
+        """Test that a final line without a newline is still yielded."""
+        response = Mock(raw=io.BytesIO(b'data: one\ndata: two'))
+
+        assert list(_iter_sse_batches(response)) == [[b'data: one'], [b'data: two']]
+
+    def test_falls_back_to_iter_lines(self):
+        """Test fallback when the raw stream can't be read directly."""
+        response = Mock()
+        response.iter_lines = Mock(return_value=[b'data: x'])
+
+        assert list(_iter_sse_batches(response)) == [[b'data: x']]
+
+    @patch.object(requests.Session, 'post')
+    def test_stream_from_raw(self, mock_post):
+        """Test chat_stream reading content from a raw stream, one chunk per read."""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.raw = io.BytesIO(
+            b'data: {"choices": [{"delta": {"content": "Hello"}}]}\n\n'
+            b'data: {"choices": [{"delta": {"content": " world"}}]}\n\n'
+            b'data: [DONE]\n\n'
+        )
+        mock_post.return_value = mock_response
+
+        client = OpenRouterClient("sk-test-token", "test-model")
+        chunks = list(client.chat_stream([{"role": "user", "content": "Hi"}]))
+
+        # Both events arrive in the same read, so they are coalesced
+        assert chunks == ["Hello world"]
+
+
 class TestErrorHandling:
     """Test error handling in OpenRouterClient."""
 
-    @patch('terminal_chat.cli.requests.post')
+    @patch.object(requests.Session, 'post')
     def test_http_401_error(self, mock_post):
         """Test handling of 401 Unauthorized error."""
         mock_response = Mock()
@@ -212,7 +307,7 @@ class TestErrorHandling:
 
         assert "401" in str(exc_info.value) or "Invalid API key" in str(exc_info.value)
 
-    @patch('terminal_chat.cli.requests.post')
+    @patch.object(requests.Session, 'post')
     def test_http_429_error(self, mock_post):
         """Test handling of 429 Rate Limit error."""
         mock_response = Mock()
@@ -229,7 +324,7 @@ class TestErrorHandling:
 
         assert "429" in str(exc_info.value) or "Rate limit" in str(exc_info.value)
 
-    @patch('terminal_chat.cli.requests.post')
+    @patch.object(requests.Session, 'post')
     def test_http_500_error(self, mock_post):
         """Test handling of 500 Server Error."""
         mock_response = Mock()
@@ -246,7 +341,7 @@ class TestErrorHandling:
 
         assert "500" in str(exc_info.value)
 
-    @patch('terminal_chat.cli.requests.post')
+    @patch.object(requests.Session, 'post')
     def test_network_error(self, mock_post):
         """Test handling of network errors."""
         mock_post.side_effect = requests.exceptions.ConnectionError("Network error")
@@ -257,7 +352,7 @@ class TestErrorHandling:
         with pytest.raises(requests.exceptions.ConnectionError):
             list(client.chat_stream(messages))
 
-    @patch('terminal_chat.cli.requests.post')
+    @patch.object(requests.Session, 'post')
     def test_timeout_error(self, mock_post):
         """Test handling of timeout errors."""
         mock_post.side_effect = requests.exceptions.Timeout("Request timeout")
@@ -268,7 +363,7 @@ class TestErrorHandling:
         with pytest.raises(requests.exceptions.Timeout):
             list(client.chat_stream(messages))
 
-    @patch('terminal_chat.cli.requests.post')
+    @patch.object(requests.Session, 'post')
     def test_error_message_extraction(self, mock_post):
         """Test extraction of error message from response."""
         mock_response = Mock()
@@ -296,7 +391,7 @@ class TestErrorHandling:
 class TestInterrupt:
     """Test interrupt functionality."""
 
-    @patch('terminal_chat.cli.requests.post')
+    @patch.object(requests.Session, 'post')
     def test_interrupt_stops_stream(self, mock_post):
         """Test that interrupt stops the stream."""
         mock_response = Mock()
@@ -336,12 +431,12 @@ class TestInterrupt:
 
         assert client.session is None
 
-    @patch('terminal_chat.cli.requests.post')
+    @patch.object(requests.Session, 'post')
     def test_interrupt_with_session(self, mock_post):
         """Test interrupt closes session."""
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.iter_lines = Mock(return_value=[b'data: [DONE]\n\n'])
+        mock_response.iter_lines = mock_iter_lines(_DONE_LINES)
         mock_post.return_value = mock_response
 
         client = OpenRouterClient("sk-test-token", "test-model")
@@ -359,12 +454,12 @@ class TestInterrupt:
 class TestRequestHeaders:
     """Test request headers and configuration."""
 
-    @patch('terminal_chat.cli.requests.post')
+    @patch.object(requests.Session, 'post')
     def test_authorization_header(self, mock_post):
         """Test that Authorization header is set correctly."""
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.iter_lines = Mock(return_value=[b'data: [DONE]\n\n'])
+        mock_response.iter_lines = mock_iter_lines(_DONE_LINES)
         mock_post.return_value = mock_response
 
         client = OpenRouterClient("sk-test-api-key", "test-model")
@@ -372,18 +467,18 @@ class TestRequestHeaders:
 
         list(client.chat_stream(messages))
 
-        call_args = mock_post.call_args
-        headers = call_args[1]["headers"]
+        # Headers are set once on the session rather than passed with every post
+        headers = client.session.headers
 
         assert "Authorization" in headers
         assert headers["Authorization"] == "Bearer sk-test-api-key"
 
-    @patch('terminal_chat.cli.requests.post')
+    @patch.object(requests.Session, 'post')
     def test_custom_headers(self, mock_post):
         """Test that custom headers are included."""
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.iter_lines = Mock(return_value=[b'data: [DONE]\n\n'])
+        mock_response.iter_lines = mock_iter_lines(_DONE_LINES)
         mock_post.return_value = mock_response
 
         client = OpenRouterClient("sk-test-token", "test-model")
@@ -391,18 +486,17 @@ class TestRequestHeaders:
 
         list(client.chat_stream(messages))
 
-        call_args = mock_post.call_args
-        headers = call_args[1]["headers"]
+        headers = client.session.headers
 
         # Check for custom headers (may include Referer, X-Title, etc.)
         assert "Authorization" in headers
 
-    @patch('terminal_chat.cli.requests.post')
+    @patch.object(requests.Session, 'post')
     def test_request_timeout(self, mock_post):
         """Test that request has timeout configured."""
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.iter_lines = Mock(return_value=[b'data: [DONE]\n\n'])
+        mock_response.iter_lines = mock_iter_lines(_DONE_LINES)
         mock_post.return_value = mock_response
 
         client = OpenRouterClient("sk-test-token", "test-model")
@@ -420,12 +514,12 @@ class TestRequestHeaders:
 class TestMessageFormatting:
     """Test message formatting for API."""
 
-    @patch('terminal_chat.cli.requests.post')
+    @patch.object(requests.Session, 'post')
     def test_single_message(self, mock_post):
         """Test formatting single message."""
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.iter_lines = Mock(return_value=[b'data: [DONE]\n\n'])
+        mock_response.iter_lines = mock_iter_lines(_DONE_LINES)
         mock_post.return_value = mock_response
 
         client = OpenRouterClient("sk-test-token", "test-model")
@@ -434,18 +528,18 @@ class TestMessageFormatting:
         list(client.chat_stream(messages))
 
         call_args = mock_post.call_args
-        sent_messages = call_args[1]["json"]["messages"]
+        sent_messages = json.loads(call_args[1]["data"])["messages"]
 
         assert len(sent_messages) == 1
         assert sent_messages[0]["role"] == "user"
         assert sent_messages[0]["content"] == "Hello"
 
-    @patch('terminal_chat.cli.requests.post')
+    @patch.object(requests.Session, 'post')
     def test_conversation_messages(self, mock_post):
         """Test formatting conversation with multiple messages."""
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.iter_lines = Mock(return_value=[b'data: [DONE]\n\n'])
+        mock_response.iter_lines = mock_iter_lines(_DONE_LINES)
         mock_post.return_value = mock_response
 
         client = OpenRouterClient("sk-test-token", "test-model")
@@ -459,18 +553,18 @@ class TestMessageFormatting:
         list(client.chat_stream(messages))
 
         call_args = mock_post.call_args
-        sent_messages = call_args[1]["json"]["messages"]
+        sent_messages = json.loads(call_args[1]["data"])["messages"]
 
         assert len(sent_messages) == 4
         assert sent_messages[0]["role"] == "system"
         assert sent_messages[-1]["content"] == "How are you?"
 
-    @patch('terminal_chat.cli.requests.post')
+    @patch.object(requests.Session, 'post')
     def test_empty_messages_list(self, mock_post):
         """Test handling empty messages list."""
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.iter_lines = Mock(return_value=[b'data: [DONE]\n\n'])
+        mock_response.iter_lines = mock_iter_lines(_DONE_LINES)
         mock_post.return_value = mock_response
 
         client = OpenRouterClient("sk-test-token", "test-model")
@@ -479,7 +573,7 @@ class TestMessageFormatting:
         list(client.chat_stream(messages))
 
         call_args = mock_post.call_args
-        sent_messages = call_args[1]["json"]["messages"]
+        sent_messages = json.loads(call_args[1]["data"])["messages"]
 
         assert sent_messages == []
 
@@ -494,7 +588,7 @@ class TestUsageTracking:
         assert client.input_tokens == 0
         assert client.output_tokens == 0
 
-    @patch('terminal_chat.cli.requests.post')
+    @patch.object(requests.Session, 'post')
     def test_usage_accumulation(self, mock_post):
         """Test that usage accumulates across multiple requests."""
         client = OpenRouterClient("sk-test-token", "test-model")